@@ -0,0 +1,153 @@
+"""
+Benchmark: batched DataMapper vs. the original per-subscriber mapper.
+
+Usage:
+    python -m benchmarks.bench_data_mapper [--sizes 1000,10000,100000] [--rounds N]
+
+Synthetic enriched subscribers include the awkward cases seen in production
+(missing referrer info, malformed timestamps, unknown countries). Each size
+checks that both mappers produce byte-for-byte identical JSON and sink rows.
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from datetime import datetime
+
+from utils.data_mapper import COUNTRIES_METADATA_FILE, DataMapper
+from utils.schema import RowBatch
+
+_country_metadata = None
+
+
+def get_country_metadata():
+    """Countries Metadata by country name, parsed from the JSON on first use."""
+    global _country_metadata
+    if _country_metadata is None:
+        with open(COUNTRIES_METADATA_FILE, "r", encoding="utf-8") as f:
+            _country_metadata = {c["name"]: c for c in json.load(f)}
+    return _country_metadata
+
+
+def legacy_combine_data(subscribers):
+    """The per-subscriber mapper as it was before batching, kept as the reference."""
+    country_metadata = get_country_metadata()
+    combined_data = []
+
+    for subscriber in subscribers:
+        try:
+            subscriber_email = subscriber.get('email', '')
+            subscriber_created_at = subscriber.get('created_at', '')
+
+            formatted_date = None
+            if subscriber_created_at:
+                try:
+                    parsed_date = datetime.strptime(subscriber_created_at, "%Y-%m-%dT%H:%M:%SZ")
+                    delta = parsed_date - datetime(1900, 1, 1)
+                    formatted_date = delta.days + 2
+                except ValueError as e:
+                    logging.error(f"Invalid date format for {subscriber_created_at}: {e}")
+                    formatted_date = 0
+
+            referrer_info = subscriber.get("referrer_info", {})
+            if referrer_info is None:
+                referrer_info = {}
+                logging.warning(f"Referrer info is None for subscriber: {subscriber_email}")
+
+            referrer_utm = referrer_info.get("referrer_utm", {})
+            country = subscriber.get("location_country", "")
+            combined_data.append({
+                "subscriber_created_at": formatted_date,
+                "subscriber_state": subscriber.get("status", ""),
+                "subscriber_email": subscriber_email,
+                "referrer_name": referrer_info.get("origin", {}).get("name", ""),
+                "referrer_domain": referrer_info.get("referrer_domain", ""),
+                "referrer_utm_source": referrer_utm.get("source", ""),
+                "referrer_utm_medium": referrer_utm.get("medium", ""),
+                "referrer_utm_campaign": referrer_utm.get("campaign", ""),
+                "referrer_utm_content": referrer_utm.get("content", ""),
+                "subscriber_physical_state": subscriber.get("location_state", ""),
+                "subscriber_country": subscriber.get("location_country", ""),
+                "Subscriber Region": country_metadata.get(country, {}).get("region", "N/A"),
+                "Subscriber Purchase Power": country_metadata.get(country, {}).get("purchasing_power", "N/A"),
+                "Subscriber Purchase Score": country_metadata.get(country, {}).get("purchase_score", "N/A")
+            })
+        except Exception as e:
+            logging.error(f"Error processing subscriber {subscriber_email}: {e}")
+            continue
+
+    return combined_data
+
+
+def synthetic_subscribers(count, seed=0):
+    rng = random.Random(seed)
+    countries = list(get_country_metadata())[:50] + ["N/A", None, "Atlantis"]
+    odd_dates = ["", None, "2025-02-30T10:00:00Z", "2025-1-5T1:2:3Z", "yesterday", "2025-03-01T24:00:00Z"]
+    subscribers = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.02:
+            created_at = rng.choice(odd_dates)
+        else:
+            created_at = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z"
+
+        if roll > 0.995:
+            referrer_info = None
+        elif roll > 0.993:
+            referrer_info = {"origin": None}  # Malformed: the row is skipped
+        else:
+            referrer_info = {
+                "origin": {"name": rng.choice(["Instagram", "Facebook", "Google", ""])},
+                "referrer_domain": rng.choice(["instagram.com", "facebook.com", ""]),
+                "referrer_utm": {"source": rng.choice(["ig", "fb", ""]), "medium": "social",
+                                 "campaign": f"campaign-{rng.randint(1, 20)}", "content": ""},
+            }
+
+        subscribers.append({
+            "id": i,
+            "email": f"user{i}@example.com",
+            "status": rng.choice(["active", "inactive", "cancelled"]),
+            "created_at": created_at,
+            "location_state": rng.choice(["CA", "NY", "Lagos", None]),
+            "location_country": rng.choice(countries),
+            "referrer_info": referrer_info,
+        })
+    return subscribers
+
+
+def timed(func, subscribers, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func(subscribers)
+    return (time.perf_counter() - start) / rounds, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the batched and per-subscriber data mappers.")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # The odd rows log on every round; keep the output to the timings
+    logging.disable(logging.CRITICAL)
+    # The country tables and NumPy load on first use; keep that out of the timings
+    DataMapper.build_rows(synthetic_subscribers(10))
+
+    for size in args.sizes:
+        subscribers = synthetic_subscribers(size)
+        legacy_time, legacy_records = timed(legacy_combine_data, subscribers, args.rounds)
+        batch_time, batch_records = timed(DataMapper.combine_data, subscribers, args.rounds)
+
+        same_records = json.dumps(legacy_records) == json.dumps(batch_records)
+        same_rows = json.dumps(RowBatch.from_records(legacy_records).rows()) == json.dumps(DataMapper.build_rows(subscribers).rows())
+        match = "identical" if same_records and same_rows else "MISMATCH"
+        print(f"{size} rows: per-subscriber {legacy_time * 1000:.1f} ms, batched {batch_time * 1000:.1f} ms, "
+              f"{legacy_time / batch_time:.2f}x faster, {len(batch_records)} mapped, {match}")
+        if match != "identical":
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
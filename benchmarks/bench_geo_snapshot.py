@@ -0,0 +1,192 @@
+"""
+Benchmark: compiled Countries Metadata snapshot vs. parsing the JSON into dicts.
+
+Usage:
+    python -m benchmarks.bench_geo_snapshot [--json_path data/Countries\\ Metadata.json] [--countries 250]
+
+Without --json_path a synthetic file of production shape is generated (about
+150k cities, with city and state names shared across countries). Each loader
+runs in a fresh process so load time and peak RSS are measured from a clean
+start. The snapshot's lookups and country fields are checked against the
+dict-based index for every city/state pair in the file.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+
+from utils.geo_snapshot import GeoSnapshot, load_snapshot, snapshot_path_for, write_snapshot
+
+
+class DictGeoIndex:
+    """The dict-of-dicts index built from the parsed JSON, kept as the reference."""
+
+    def __init__(self, countries):
+        self.capitals, self.city_states, self.city_countries = {}, {}, {}
+        self.states, self.state_countries, self.any_city = {}, {}, {}
+        for country in countries:
+            country_name = country['name']
+            capital = (country.get('capital') or '').lower().strip()
+            self.capitals.setdefault(capital, country_name)
+            self.any_city.setdefault(capital, country_name)
+            for state in country.get('states', []):
+                state_name = state['name'].lower().strip()
+                self.states.setdefault(state_name, country_name)
+                self.state_countries.setdefault(state_name, set()).add(country_name)
+                for city in state.get('cities', []):
+                    city_name = city['name'].lower().strip()
+                    self.city_states.setdefault((city_name, state_name), country_name)
+                    self.city_countries.setdefault(city_name, set()).add(country_name)
+                    self.any_city.setdefault(city_name, country_name)
+
+    def search(self, city, state):
+        if not city and not state:
+            return "N/A"
+        if city and city in self.capitals:
+            return self.capitals[city]
+        exact_match_country = self.city_states.get((city, state))
+        if exact_match_country:
+            return exact_match_country
+        candidate_countries = self.city_countries.get(city, set())
+        if state and len(candidate_countries) > 1:
+            narrowed_candidates = candidate_countries & self.state_countries.get(state, set())
+            if len(narrowed_candidates) == 1:
+                return next(iter(narrowed_candidates))
+        if state and state in self.states:
+            return self.states[state]
+        return "N/A"
+
+    def handle(self, city):
+        if city and city in self.any_city:
+            return self.any_city[city]
+        return "N/A"
+
+
+def synthetic_metadata(path, country_count, seed=0):
+    rng = random.Random(seed)
+    shared_cities = [f"Springfield {i}" for i in range(300)]
+    shared_states = [f"Central {i}" for i in range(40)]
+    countries = []
+    for c in range(country_count):
+        states = []
+        for s in range(rng.randint(10, 30)):
+            state_name = rng.choice(shared_states) if rng.random() < 0.1 else f"State {c}-{s}"
+            cities = [{"name": rng.choice(shared_cities) if rng.random() < 0.05 else f"City {c}-{s}-{i}"}
+                      for i in range(rng.randint(15, 40))]
+            states.append({"name": state_name, "cities": cities})
+        countries.append({
+            "name": f"Country {c}",
+            "capital": f"City {c}-0-0" if c % 3 else f"Capital {c}",
+            "region": rng.choice(["Africa", "Americas", "Asia", "Europe", "Oceania"]),
+            "purchasing_power": rng.choice(["low", "medium", "high", None]),
+            "purchase_score": rng.choice([1, 2, 3, 4.5, "N/A"]),
+            "states": states,
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(countries, f)
+
+
+def peak_rss_mb():
+    """Peak RSS of this process's address space (VmHWM, which unlike ru_maxrss resets on exec)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_json_index(json_path, results):
+    start = time.perf_counter()
+    with open(json_path, "r", encoding="utf-8") as f:
+        countries = json.load(f)
+    index = DictGeoIndex(countries)
+    lookup = {c["name"]: c for c in countries}
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, peak_rss_mb(), len(index.any_city), len(lookup)))
+
+
+def load_snapshot_index(json_path, results):
+    start = time.perf_counter()
+    snapshot = load_snapshot(json_path)
+    lookup = snapshot.country_lookup()
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, peak_rss_mb(), snapshot.metadata_hash[:12], len(lookup)))
+
+
+def in_fresh_process(target, json_path):
+    # Spawned, not forked, so the loader starts from a bare interpreter
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=target, args=(json_path, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"{target.__name__} exited with code {process.exitcode}")
+    return results.get()
+
+
+def verify(json_path):
+    """Compare every lookup the resolver can make against the dict-based index."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        countries = json.load(f)
+    reference = DictGeoIndex(countries)
+    snapshot = GeoSnapshot.open(snapshot_path_for(json_path))
+    from utils.geo_index import GeoIndex
+    index = GeoIndex(snapshot)
+
+    pairs = list(reference.city_states) + [(city, "nowhere") for city in list(reference.any_city)[:2000]]
+    pairs += [(None, state) for state in reference.states] + [("atlantis", None), (None, None), ("", "")]
+    mismatches = sum(index.search(city, state) != reference.search(city, state) for city, state in pairs)
+    mismatches += sum(index.handle(city) != reference.handle(city) for city in list(reference.any_city) + ["atlantis"])
+
+    expected = {c["name"]: (c.get("region", "N/A"), c.get("purchasing_power", "N/A"), c.get("purchase_score", "N/A"))
+                for c in countries}
+    lookup = snapshot.country_lookup()
+    if json.dumps(lookup, sort_keys=True) != json.dumps(expected, sort_keys=True):
+        mismatches += 1
+    return len(pairs), mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare loading the geo snapshot with parsing the JSON.")
+    parser.add_argument("--json_path", default=None, help="Countries Metadata file; synthetic when omitted")
+    parser.add_argument("--countries", type=int, default=250, help="Countries in the synthetic file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = args.json_path
+        if json_path is None:
+            json_path = os.path.join(tmp, "Countries Metadata.json")
+            synthetic_metadata(json_path, args.countries)
+        else:
+            # Keep the real data directory untouched; compile a copy
+            with open(json_path, "rb") as source, open(os.path.join(tmp, "Countries Metadata.json"), "wb") as copy:
+                copy.write(source.read())
+            json_path = os.path.join(tmp, "Countries Metadata.json")
+
+        start = time.perf_counter()
+        data = write_snapshot(json_path)
+        build_seconds = time.perf_counter() - start
+        print(f"JSON {os.path.getsize(json_path) / 1e6:.1f} MB -> snapshot {len(data) / 1e6:.1f} MB, "
+              f"built in {build_seconds * 1000:.0f} ms")
+
+        json_seconds, json_rss, keys, _ = in_fresh_process(load_json_index, json_path)
+        snapshot_seconds, snapshot_rss, digest, _ = in_fresh_process(load_snapshot_index, json_path)
+        print(f"json.load + dict index: {json_seconds * 1000:.1f} ms, peak RSS {json_rss:.0f} MiB ({keys} city keys)")
+        print(f"mmap snapshot:          {snapshot_seconds * 1000:.1f} ms, peak RSS {snapshot_rss:.0f} MiB (sha256 {digest}...)")
+
+        checked, mismatches = verify(json_path)
+        print(f"{checked} lookups checked: {'identical' if not mismatches else f'{mismatches} MISMATCHES'}")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
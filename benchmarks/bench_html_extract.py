@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: streaming location extractor vs. full BeautifulSoup parse.
+
+Usage:
+    python -m benchmarks.bench_html_extract [saved_page.html ...] [--rounds N]
+
+Saved app.kit.com subscriber pages can be passed as fixtures; without any, a
+synthetic page of similar shape is generated.
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from utils.html_extractor import LocationExtractor
+
+CHUNK_SIZE = 65536
+
+
+def synthetic_page(rows=1500):
+    head = "<html><head>" + "<script>var x = '<div data-city>';</script>" * 50 + "</head><body>"
+    filler = [
+        f'<div class="row" data-id="{i}"><span class="label">Field {i}</span><a href="/x/{i}">link &amp; more</a></div>'
+        for i in range(rows)
+    ]
+    # Put the location element part-way down, behind script noise that must not match
+    filler.insert(rows // 3, '<div class="subscriber-location" data-city="S&atilde;o Paulo" data-state="SP"></div>')
+    return (head + "".join(filler) + "</body></html>").encode("utf-8")
+
+
+def soup_extract(body):
+    soup = BeautifulSoup(body.decode("utf-8"), "html.parser")
+    locations = soup.find(attrs={"data-city": True, "data-state": True})
+    if locations:
+        return locations["data-city"], locations["data-state"]
+    return None, None
+
+
+def fast_extract(body):
+    extractor = LocationExtractor("utf-8")
+    for start in range(0, len(body), CHUNK_SIZE):
+        if extractor.feed(body[start:start + CHUNK_SIZE]):
+            return extractor.location
+    location = extractor.finish()
+    return location if location is not None else soup_extract(body)
+
+
+def timed(func, body, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func(body)
+    return (time.perf_counter() - start) / rounds, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare location extraction strategies on subscriber pages.")
+    parser.add_argument("pages", nargs="*", help="Saved subscriber page HTML files")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    fixtures = [(path, open(path, "rb").read()) for path in args.pages] or [("synthetic", synthetic_page())]
+    for name, body in fixtures:
+        soup_time, soup_result = timed(soup_extract, body, args.rounds)
+        fast_time, fast_result = timed(fast_extract, body, args.rounds)
+        match = "match" if tuple(soup_result) == tuple(fast_result) else f"MISMATCH {soup_result} != {fast_result}"
+        print(f"{name} ({len(body) / 1024:.0f} KiB): BeautifulSoup {soup_time * 1000:.2f} ms, "
+              f"streaming {fast_time * 1000:.2f} ms, {soup_time / fast_time:.1f}x faster, {match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+End-to-end benchmark: AsyncMainRunner against a local stand-in for Kit.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--sizes 1000,10000,50000] [--latency_ms 10] [--jitter_ms 5]
+                                        [--rate_429 0.01] [--error_rate 0.005] [--retry_after 0.05]
+                                        [--listed_fields_rate 1.0]
+
+A local aiohttp server plays api.kit.com (paginated /v4/subscribers and the
+/v4/subscribers/{id} UTM fields) and app.kit.com (the subscriber page and
+/referrer_info), injecting latency, 429s and 500s. The runner writes to fake
+Sheets/Supabase sinks and keeps all run state in memory, so nothing touches
+production or the local state files. Each size runs in its own process, so
+peak RSS is per run. --listed_fields_rate below 1 lists that share of
+subscribers without their fields, which sends their UTM fallback through the
+per-subscriber endpoint.
+
+data/Countries Metadata.json must be present, as for a normal run.
+"""
+import argparse
+import asyncio
+import bisect
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import sys
+import time
+import types
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+from utils.http_session import ConnectionStats
+from utils.sinks import Sink
+
+BENCH_DAY = "2025-01-15"
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+LOCATIONS = [("Lagos", "Lagos"), ("Austin", "Texas"), ("Toronto", "Ontario"), ("Munich", "Bavaria"), ("", "")]
+REFERRERS = [
+    ("Instagram", "instagram.com", {"source": "ig", "medium": "social", "campaign": "launch", "content": "story"}),
+    ("Facebook", "facebook.com", {"source": "", "medium": "", "campaign": "", "content": ""}),
+    ("Google", "google.com", {"source": "google", "medium": "cpc", "campaign": "brand", "content": ""}),
+]
+
+
+def build_app(count, options):
+    """The fake Kit endpoints over `count` subscribers created on BENCH_DAY."""
+    rng = random.Random(options["seed"])
+    day_start = datetime.strptime(BENCH_DAY, "%Y-%m-%d")
+    subscribers = []
+    listed = []
+    for i in range(count):
+        subscribers.append({
+            "id": 10_000_000 + i,
+            "first_name": f"User {i}",
+            "email_address": f"user{i}@example.com",
+            "state": "active",
+            "created_at": (day_start + timedelta(seconds=i * 86400 // count)).strftime(ISO_FORMAT),
+            "fields": {"utm_source": rng.choice(["fb", "newsletter", "120238339349620295"]),
+                       "utm_medium": rng.choice(["paid", "email", ""]),
+                       "utm_campaign": rng.choice(["launch", "12345678901", None]),
+                       "utm_content": None},
+        })
+        listed.append(subscribers[-1] if rng.random() < options["listed_fields_rate"]
+                      else {key: value for key, value in subscribers[-1].items() if key != "fields"})
+    by_id = {subscriber["id"]: subscriber for subscriber in subscribers}
+    created = [subscriber["created_at"] for subscriber in subscribers]
+    filler = "".join(f'<div class="row"><span>Field {i}</span><a href="/x/{i}">more</a></div>' for i in range(300))
+
+    @web.middleware
+    async def faults(request, handler):
+        await asyncio.sleep((options["latency_ms"] + rng.uniform(0, options["jitter_ms"])) / 1000)
+        roll = rng.random()
+        if roll < options["rate_429"]:
+            return web.Response(status=429, headers={"Retry-After": str(options["retry_after"])})
+        if roll < options["rate_429"] + options["error_rate"]:
+            return web.Response(status=500, text="injected error")
+        return await handler(request)
+
+    async def list_subscribers(request):
+        low = bisect.bisect_left(created, request.query["created_after"])
+        high = bisect.bisect_right(created, request.query["created_before"])
+        start = int(request.query.get("after", low))
+        page = listed[start:min(start + int(request.query.get("per_page", 500)), high)]
+        end = start + len(page)
+        return web.json_response({
+            "subscribers": page,
+            "pagination": {"has_next_page": end < high, "end_cursor": str(end) if page else None},
+        })
+
+    async def subscriber_fields(request):
+        subscriber = by_id.get(int(request.match_info["id"]))
+        if subscriber is None:
+            return web.json_response({"errors": ["Not Found"]}, status=404)
+        return web.json_response({"subscriber": subscriber})
+
+    async def subscriber_page(request):
+        city, state = LOCATIONS[int(request.match_info["id"]) % len(LOCATIONS)]
+        location = f'<div class="subscriber-location" data-city="{city}" data-state="{state}"></div>' if city else ""
+        body = f"<html><head><title>Subscriber</title></head><body>{filler}{location}{filler}</body></html>"
+        return web.Response(text=body, content_type="text/html")
+
+    async def referrer_info(request):
+        name, domain, utm = REFERRERS[int(request.match_info["id"]) % len(REFERRERS)]
+        return web.json_response({"origin": {"name": name}, "referrer_domain": domain, "referrer_utm": dict(utm)})
+
+    app = web.Application(middlewares=[faults])
+    app.router.add_get("/v4/subscribers", list_subscribers)
+    app.router.add_get("/v4/subscribers/{id}", subscriber_fields)
+    app.router.add_get("/subscribers/{id}", subscriber_page)
+    app.router.add_get("/subscribers/{id}/referrer_info", referrer_info)
+    return app
+
+
+def serve(port, count, options):
+    web.run_app(build_app(count, options), host="127.0.0.1", port=port, print=None, handle_signals=True)
+
+
+class FakeSheetsSink(Sink):
+    name = "sheets"
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000
+        self.rows = 0
+
+    def write(self, batch):
+        self.rows += len(batch.rows())
+        time.sleep(self.latency)
+
+
+class FakeSupabaseSink(Sink):
+    name = "supabase"
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000
+
+    def write(self, batch):
+        batch.records()
+        time.sleep(self.latency)
+
+
+class LatencyStats(ConnectionStats):
+    """ConnectionStats that also records every request's latency and status."""
+
+    def __init__(self):
+        super().__init__()
+        self.latencies = []
+        self.statuses = Counter()
+
+    async def on_request_start(self, session, trace_config_ctx, params):
+        await super().on_request_start(session, trace_config_ctx, params)
+        trace_config_ctx.started = time.perf_counter()
+
+    async def on_request_end(self, session, trace_config_ctx, params):
+        self.latencies.append(time.perf_counter() - trace_config_ctx.started)
+        self.statuses[params.response.status] += 1
+
+    def trace_config(self):
+        trace_config = super().trace_config()
+        trace_config.on_request_end.append(self.on_request_end)
+        return trace_config
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def prepare_runner_environment():
+    """Keep the run off production credentials and the on-disk run state."""
+    try:
+        import config.headers  # noqa: F401
+    except ImportError:
+        # The app.kit.com session headers are a deployment secret; the fake server ignores them
+        stub = types.ModuleType("config.headers")
+        stub.headers = {}
+        sys.modules["config.headers"] = stub
+
+    # The fake server ignores the key, but aiohttp rejects a missing header value
+    os.environ.setdefault("KIT_V4_API_KEY", "bench")
+
+    from config import settings
+    settings.geo_cache_path = None
+    settings.enrichment_cache_path = None
+    settings.completed_days_path = None
+    settings.pagination_checkpoint_path = None
+    settings.incremental_state_path = None
+    settings.metrics_report_path = None
+
+
+def run_pipeline(count, port, options, results):
+    prepare_runner_environment()
+    from main import AsyncMainRunner
+    from utils.metrics import run_metrics
+    from utils.sinks import SinkFanout
+
+    root = f"http://127.0.0.1:{port}"
+    runner = AsyncMainRunner(api_max_concurrent=options["api_max_concurrent"],
+                             app_max_concurrent=options["app_max_concurrent"],
+                             sinks=["csv"],
+                             api_base_url=f"{root}/v4",
+                             app_base_url=f"{root}/subscribers")
+    sheets = FakeSheetsSink(options["sink_latency_ms"])
+    runner.sinks = SinkFanout([sheets, FakeSupabaseSink(options["sink_latency_ms"])])
+    runner.connection_stats = stats = LatencyStats()
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        asyncio.run(runner.run(BENCH_DAY, BENCH_DAY, reprocess=True))
+        elapsed = time.perf_counter() - start
+
+    results.put({
+        "rows": sheets.rows,
+        "seconds": elapsed,
+        "requests": len(stats.latencies),
+        "p50_ms": percentile(stats.latencies, 0.50) * 1000,
+        "p99_ms": percentile(stats.latencies, 0.99) * 1000,
+        "statuses": dict(stats.statuses),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": run_metrics.summary(),
+        "fields_lookup": runner.fields_lookup.summary(),
+    })
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake Kit server did not start on port {port}")
+
+
+def bench_size(count, options):
+    port = free_port()
+    server = multiprocessing.Process(target=serve, args=(port, count, options), daemon=True)
+    server.start()
+    try:
+        wait_for_port(port)
+        results = multiprocessing.Queue()
+        runner = multiprocessing.Process(target=run_pipeline, args=(count, port, options, results))
+        runner.start()
+        runner.join()
+        if runner.exitcode != 0:
+            raise RuntimeError(f"Pipeline run for {count} subscribers exited with code {runner.exitcode}")
+        return results.get()
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full pipeline against a local Kit stand-in.")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[1000, 10000, 50000])
+    parser.add_argument("--latency_ms", type=float, default=10.0, help="Base latency of every fake response")
+    parser.add_argument("--jitter_ms", type=float, default=5.0, help="Uniform extra latency on top of the base")
+    parser.add_argument("--rate_429", type=float, default=0.01, help="Fraction of requests answered with 429")
+    parser.add_argument("--error_rate", type=float, default=0.005, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry_after", type=float, default=0.05, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--listed_fields_rate", type=float, default=1.0,
+                        help="Fraction of subscribers listed with their custom fields")
+    parser.add_argument("--sink_latency_ms", type=float, default=50.0, help="Time each fake sink write takes")
+    parser.add_argument("--api_max_concurrent", type=int, default=None)
+    parser.add_argument("--app_max_concurrent", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    options = {key: value for key, value in vars(args).items() if key != "sizes"}
+
+    for count in args.sizes:
+        result = bench_size(count, options)
+        print(f"{count} subscribers: {result['rows']} rows in {result['seconds']:.1f}s "
+              f"({result['rows'] / result['seconds']:.0f} rows/s), {result['requests']} requests, "
+              f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MiB, statuses {result['statuses']}")
+        print(f"    UTM fallback fields: {result['fields_lookup']}")
+        for line in result["stages"]:
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: process startup, measured with python -X importtime.
+
+Usage:
+    python -m benchmarks.bench_startup [--rounds 5] [--top 15]
+
+Each round starts a fresh interpreter that imports main.py, then another that
+runs `main.py --dry_run`, so the numbers include everything a small cron run
+pays before its first request. Reports the median import time of main, the
+modules with the largest cumulative import time, and the heavy dependencies
+(which should only load on first use) that were imported anyway.
+
+data/Countries Metadata.json must be present for the dry run's health check;
+config/headers.py is stubbed when it is missing, as in bench_pipeline.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies only some runs need; none of them should load at startup
+HEAVY_MODULES = ("pandas", "numpy", "googleapiclient", "google.oauth2", "supabase", "bs4", "rich", "requests")
+
+STUB_HEADERS = """
+import sys, types
+try:
+    import config.headers
+except ImportError:
+    stub = types.ModuleType("config.headers")
+    stub.headers = {}
+    sys.modules["config.headers"] = stub
+"""
+
+IMPORT_MAIN = STUB_HEADERS + """
+import main
+print(",".join(name for name in %r if name in sys.modules))
+""" % (HEAVY_MODULES,)
+
+DRY_RUN = STUB_HEADERS + """
+import runpy
+sys.argv = ["main.py", "--dry_run", "--log_format", "plain", "--log_level", "error"]
+runpy.run_path("main.py", run_name="__main__")
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output.
+
+    Returns:
+        dict: Module name -> (self microseconds, cumulative microseconds).
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_python(code, importtime=False):
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True)
+    return result, time.perf_counter() - start
+
+
+def bench_import(rounds):
+    main_times = []
+    modules = {}
+    heavy = ""
+    for _ in range(rounds):
+        result, _ = run_python(IMPORT_MAIN, importtime=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing main failed:\n{result.stderr[-2000:]}")
+        modules = parse_importtime(result.stderr)
+        main_times.append(modules["main"][1] / 1000)
+        heavy = result.stdout.strip()
+    return statistics.median(main_times), modules, heavy
+
+
+def bench_dry_run(rounds):
+    times = []
+    for _ in range(rounds):
+        result, elapsed = run_python(DRY_RUN)
+        # A failed health check (exit code 1) is still a complete dry run
+        if result.returncode not in (0, 1):
+            raise RuntimeError(f"Dry run failed:\n{result.stderr[-2000:]}")
+        times.append(elapsed * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and dry-run startup time.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    main_ms, modules, heavy = bench_import(args.rounds)
+    print(f"import main: {main_ms:.1f} ms (median of {args.rounds})")
+    print(f"heavy modules loaded at startup: {heavy or 'none'}")
+    print("slowest imports (cumulative, nested imports included):")
+    slowest = sorted(modules.items(), key=lambda item: -item[1][1])[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+    dry_run_ms = bench_dry_run(args.rounds)
+    print(f"main.py --dry_run: {dry_run_ms:.1f} ms wall time (median of {args.rounds}, interpreter start included)")
+
+
+if __name__ == "__main__":
+    main()
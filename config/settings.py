@@ -1,25 +1,104 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 base_url = "https://api.kit.com/v4"
+app_base_url = "https://app.kit.com/subscribers"
 facebook_paid_ads = [120238339349620295, 120240689174560295, 120241477054870295 ,"fb"]
 facebook_ads_campaigns = ['12 Feb | Testing | ICP Callout', 
                           '12 Feb - ICP Callout - Controller 2',
                           'Sub | Live Webinar | Testing',
                           '08 Jan | Testing | AI Native',
                           '08 | Nicolas Info | Testing',
-                          '12 Feb | Testing | ICP Callout',
                           '12 Feb | Testing | Prompt Video',
                           '10 Feb | Testing | Organic Video',
-                          '08 | Nicolas Info | Testing',
-                          '10 Feb | Testing | Organic Video',
                           '17 Jan | Testing | AI Native Repechage',
                           'Bid Cap Graveyard | Static',
-                          '08 Jan | Testing | AI Native',
                           '17 Feb | Testing | Nicolas On Brand',
-                          'Bid Cap Graveyard | Static',
-                          '08 | Nicolas Info | Testing',
-                          'Bid Cap Graveyard | Static',
                           'ad',
                           'paid',
                           '08',
-                          '17',
-                          '08 Jan | Testing | AI Native',
-                          '08 | Nicolas Info | Testing'] #This is a list that concludes some UTMs that will be converted into a single campaign. 
\ No newline at end of file
+                          '17'] #This is a list that concludes some UTMs that will be converted into a single campaign.
+
+# UTM normalization rules (see utils/utm_normalizer.py)
+utm_ad_id_pattern = r"\b\d{11,}\b"  # Facebook ad/campaign ids pasted into UTMs
+utm_facebook_sources = ["fb"]
+utm_facebook_label = "facebook-ads"
+utm_paid_medium_label = "paid-ads"
+
+# City/state -> country resolution cache. Set geo_cache_path to None to keep it in memory only.
+geo_cache_max_size = 4096
+geo_cache_path = os.path.join(BASE_DIR, "data", "geo_cache.sqlite3")
+
+# Per-subscriber location/referrer results reused across runs. None for ttl keeps entries forever.
+enrichment_cache_path = os.path.join(BASE_DIR, "data", "enrichment_cache.sqlite3")
+enrichment_cache_ttl_days = None
+# Subscriber pages without a location element (e.g. the login page after the session cookie expired) are retried after this
+enrichment_cache_negative_ttl_days = 1
+
+# Run report with per-stage timings and per-host HTTP metrics; the Prometheus textfile is optional
+metrics_report_path = os.path.join(BASE_DIR, "data", "run_report.json")
+metrics_prometheus_path = None
+
+# Output: lowest level printed, "auto"/"rich"/"plain"/"json", and seconds between progress lines outside rich mode
+log_level = "info"
+log_format = "auto"
+log_progress_interval = 30
+
+# Shared aiohttp connection pool used by every fetcher during a run
+http_limit = 20
+http_limit_per_host = 8
+http_keepalive_timeout = 60
+http_dns_cache_ttl = 600
+http_timeout = 60
+
+# Concurrent /v4/subscribers/{id} calls allowed for the UTM custom-field fallback
+utm_fallback_max_concurrent = 2
+
+# Adaptive (AIMD) concurrency budgets per host: concurrency grows while responses
+# are healthy and is cut on 429/5xx/timeouts. Retries use jittered exponential backoff.
+rate_limits = {
+    "api.kit.com": {"initial": 3, "minimum": 1, "maximum": 10},
+    "app.kit.com": {"initial": 3, "minimum": 1, "maximum": 6},
+}
+max_retries = 4
+backoff_base = 1.0
+backoff_max = 60.0
+
+# Backfills: days processed concurrently and the record of days already written
+parallel_days = 1
+completed_days_path = os.path.join(BASE_DIR, "data", "completed_days.json")
+
+# Streaming day pipeline: rows per sink write, pages buffered ahead of enrichment, and the
+# number of subscriber workers (the per-host limiters still cap the actual requests)
+sink_chunk_size = 5000
+pipeline_queue_pages = 2
+enrich_workers = 12
+# Completed location/referrer/fields requests kept per run, so repeat requests for a subscriber are not sent
+single_flight_max_results = 100000
+
+# Subscriber pagination (failed pages are retried by the api.kit.com limiter): hourly sub-windows and resume cursors
+pagination_hourly_windows = False
+pagination_checkpoint_path = os.path.join(BASE_DIR, "data", "pagination_checkpoint.json")
+
+# Incremental runs: the persisted high-water mark, and how far behind now a run stops so
+# subscribers created in the last seconds are left for the next run once the API lists them
+incremental_state_path = os.path.join(BASE_DIR, "data", "high_water_mark.json")
+incremental_lag_seconds = 60
+
+# Google Sheets: rows per append request
+sheets_append_chunk_rows = 5000
+
+# Supabase sink: upserts keyed on the natural key, sent in parallel batches.
+# The webhook fires once per run, webhook_delay_seconds after the last batch.
+supabase_table = "kit_subscribers"
+supabase_conflict_columns = "subscriber_email"
+supabase_batch_size = 500
+supabase_max_workers = 4
+webhook_delay_seconds = 120
+
+# Output sinks written concurrently for every chunk: any of "sheets", "supabase", "csv", "parquet"
+sinks = ["sheets", "supabase"]
+sink_retries = 2
+csv_sink_path = os.path.join(BASE_DIR, "data", "output", "subscribers.csv")
+parquet_sink_dir = os.path.join(BASE_DIR, "data", "output", "parquet")
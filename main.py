@@ -1,37 +1,169 @@
 import asyncio
 import sys,os
 from datetime import datetime, timedelta, timezone
-from rich.console import Console
 from dotenv import load_dotenv
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
-from concurrent.futures import ThreadPoolExecutor
 import time, argparse
 
 
 from utils.spreadsheet_submitter import SpreadsheetSubmitter
-from utils.data_mapper import DataMapper
+from utils.supabase_submitter import SupabaseSubmitter
+from utils.sinks import SinkFanout, build_sinks
 from config.headers import headers
+from config.settings import (
+    geo_cache_max_size,
+    geo_cache_path,
+    enrichment_cache_path,
+    enrichment_cache_ttl_days,
+    completed_days_path,
+    parallel_days,
+    sink_chunk_size,
+    pipeline_queue_pages,
+    enrich_workers,
+    single_flight_max_results,
+    pagination_checkpoint_path,
+    pagination_hourly_windows,
+    incremental_state_path,
+    incremental_lag_seconds,
+    sinks as default_sinks,
+    base_url,
+    app_base_url,
+    metrics_report_path,
+    metrics_prometheus_path,
+    log_level,
+    log_format,
+    log_progress_interval,
+)
 
 # Import the new async classes
-from utils.subscriber_fetcher import SubscriberFetcher
+from utils.subscriber_fetcher import ISO_FORMAT, SubscriberFetcher
 from utils.location_fetcher import LocationFetcher
 from utils.referrer_fetcher import ReferrerInfoFetcher
+from utils.location_identifier import LocationIdentifier
+from utils.enrichment_cache import EnrichmentCache
+from utils.http_session import ConnectionStats, build_session
+from utils.rate_limiter import build_limiters
+from utils.single_flight import SingleFlight
+from utils.fields_lookup import FieldsLookup
+from utils.run_state import CompletedDays, HighWaterMark, PaginationCheckpoint
+from utils.pipeline import DayPipeline
+from utils.metrics import run_metrics
+from utils.reporter import reporter
 
 load_dotenv()
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 class AsyncMainRunner:
-    def __init__(self):
-        self.console = Console()
-        self.subscriber_fetcher = SubscriberFetcher()
-        self.headers = headers
+    def __init__(self, api_max_concurrent=None, app_max_concurrent=None, max_retries=None,
+                 hourly_windows=pagination_hourly_windows, sinks=None,
+                 cache_ttl_days=enrichment_cache_ttl_days, refresh_cache=False,
+                 api_base_url=base_url, app_base_url=app_base_url,
+                 report_path=metrics_report_path, prometheus_path=metrics_prometheus_path):
+        # Separate adaptive request budgets for api.kit.com and app.kit.com
+        self.limiters = build_limiters(api_max_concurrent=api_max_concurrent,
+                                       app_max_concurrent=app_max_concurrent,
+                                       max_retries=max_retries)
+        self.api_limiter = self.limiters["api.kit.com"]
+        self.app_limiter = self.limiters["app.kit.com"]
+        self.api_base_url = api_base_url
+        self.app_base_url = app_base_url
+        self.cache_ttl_days = cache_ttl_days
+        self.refresh_cache = refresh_cache
         
-        self.referrer_info_fetcher = ReferrerInfoFetcher(headers=self.headers)   
-        self.location_fetcher = LocationFetcher()
+        self.subscriber_fetcher = SubscriberFetcher(base_url=api_base_url, limiter=self.api_limiter)
+        self.headers = headers
+        # Caches and enrichment fetchers are built on first use, so dry runs and
+        # runs with nothing left to do never open the caches or load the geo index
+        self._enrichment_cache = None
+        self._resolution_cache = None
+        self._referrer_info_fetcher = None
+        self._location_fetcher = None
+        # Shared by both fetchers so each (endpoint, subscriber) is requested once per run
+        self.single_flight = SingleFlight(max_results=single_flight_max_results)
+        # UTM fallback fields: from the list pages, per subscriber only when a page lacked them
+        self.fields_lookup = FieldsLookup(api_base_url=api_base_url, limiter=self.api_limiter,
+                                          single_flight=self.single_flight)
+        self.connection_stats = ConnectionStats()
+        self.completed_days = CompletedDays(completed_days_path)
+        self.pagination_checkpoint = PaginationCheckpoint(pagination_checkpoint_path)
+        self.high_water_mark = HighWaterMark(incremental_state_path)
+        self.hourly_windows = hourly_windows
+        self.report_path = report_path
+        self.prometheus_path = prometheus_path
         
-        self.spreadsheet_submitter = SpreadsheetSubmitter(credentials_path = os.getenv("GOOGLE_CREDENTIALS_PATH"), 
-                                                          spreadsheet_id = os.getenv("GOOGLE_SPREADSHEET_ID"), 
-                                                          tab_name = os.getenv("GOOGLE_TAB_NAME"))
+        self.sink_names = sinks or default_sinks
+        # Submitters load credentials and connect on their first write
+        self.spreadsheet_submitter = None
+        if "sheets" in self.sink_names:
+            self.spreadsheet_submitter = SpreadsheetSubmitter(credentials_path = os.getenv("GOOGLE_CREDENTIALS_PATH"), 
+                                                              spreadsheet_id = os.getenv("GOOGLE_SPREADSHEET_ID"), 
+                                                              tab_name = os.getenv("GOOGLE_TAB_NAME"))
+        self.supabase_submitter = SupabaseSubmitter() if "supabase" in self.sink_names else None
+        # Every chunk fans out to all sinks concurrently
+        self.sinks = SinkFanout(build_sinks(self.sink_names,
+                                            spreadsheet_submitter=self.spreadsheet_submitter,
+                                            supabase_submitter=self.supabase_submitter))
+
+    @property
+    def enrichment_cache(self):
+        """Location and referrer results from earlier runs, so they are only scraped once per subscriber"""
+        if self._enrichment_cache is None:
+            self._enrichment_cache = EnrichmentCache(enrichment_cache_path, ttl_days=self.cache_ttl_days,
+                                                     refresh=self.refresh_cache)
+        return self._enrichment_cache
+
+    @property
+    def resolution_cache(self):
+        """City/state -> country memo, warmed from disk when first needed"""
+        if self._resolution_cache is None:
+            self._resolution_cache = LocationIdentifier.build_cache(max_size=geo_cache_max_size, db_path=geo_cache_path)
+        return self._resolution_cache
+
+    @property
+    def referrer_info_fetcher(self):
+        if self._referrer_info_fetcher is None:
+            self._referrer_info_fetcher = ReferrerInfoFetcher(headers=self.headers, base_url=self.app_base_url,
+                                                              limiter=self.app_limiter,
+                                                              enrichment_cache=self.enrichment_cache,
+                                                              single_flight=self.single_flight,
+                                                              fields_lookup=self.fields_lookup)
+        return self._referrer_info_fetcher
+
+    @property
+    def location_fetcher(self):
+        if self._location_fetcher is None:
+            self._location_fetcher = LocationFetcher(resolution_cache=self.resolution_cache, limiter=self.app_limiter,
+                                                     enrichment_cache=self.enrichment_cache, base_url=self.app_base_url,
+                                                     single_flight=self.single_flight)
+        return self._location_fetcher
+
+    def health_check(self):
+        """
+        Check the configuration a run needs without making any requests or writes.
+
+        Returns:
+            list: Problems found; empty when the run is ready to go.
+        """
+        problems = []
+        if not os.path.exists(LocationIdentifier.JSON_PATH):
+            problems.append(f"Countries Metadata not found at {LocationIdentifier.JSON_PATH}")
+        if not os.getenv("KIT_V4_API_KEY"):
+            problems.append("KIT_V4_API_KEY is not set")
+        if not self.headers:
+            problems.append("config/headers.py has no app.kit.com session headers")
+        if self.spreadsheet_submitter is not None:
+            credentials_path = self.spreadsheet_submitter.credentials_path
+            if not credentials_path or not os.path.exists(credentials_path):
+                problems.append(f"Google credentials file not found: {credentials_path}")
+            for name in ("GOOGLE_SPREADSHEET_ID", "GOOGLE_TAB_NAME"):
+                if not os.getenv(name):
+                    problems.append(f"{name} is not set")
+        if self.supabase_submitter is not None:
+            for name in ("SUPABASE_PROJECT_URL", "SUPABASE_PROJECT_KEY"):
+                if not os.getenv(name):
+                    problems.append(f"{name} is not set")
+        for sink in self.sinks.sinks:
+            problems.extend(sink.problems())
+        return problems
 
     def parse_date(self, date_str):
         """Parse date string in MM/DD/YYYY format to datetime object"""
@@ -46,74 +178,129 @@ class AsyncMainRunner:
                 return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
 
 
-    async def process_single_day(self, current_date):
-        """Process data for a single day"""
+    @staticmethod
+    def day_is_closed(current_date):
+        """Whether no more subscribers can be listed for the day: it ended over incremental_lag_seconds ago"""
+        day_end = current_date.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        if day_end.tzinfo is None:
+            day_end = day_end.replace(tzinfo=timezone.utc)
+        return day_end <= datetime.now(timezone.utc) - timedelta(seconds=incremental_lag_seconds)
+
+    async def process_single_day(self, current_date, session, write_after=None):
+        """
+        Process data for a single day on the run's shared HTTP session
+
+        Args:
+            current_date (datetime): Day to process.
+            session (aiohttp.ClientSession): Shared run session.
+            write_after (asyncio.Event): Set once the previous day has been written, so output stays in day order.
+        """
         day_start = current_date.strftime("%Y-%m-%dT00:00:00Z")
         day_end = current_date.replace(hour=23, minute=59, second=59).strftime("%Y-%m-%dT23:59:59Z")
         
-        self.console.print(f"[bold blue]Processing {current_date.strftime('%Y-%m-%d')}...")
+        reporter.info(f"Processing {current_date.strftime('%Y-%m-%d')}...", style="bold blue")
         
-        subscribers = await self.subscriber_fetcher.fetch_subscribers(day_start, day_end)
-        filtered_subscribers = await self.subscriber_fetcher.filter_subscribers(subscribers)
+        async def write_rows(batch, skip=()):
+            reporter.debug(f"Submitting {len(batch)} records for {current_date.strftime('%Y-%m-%d')}...")
+            return await self.sinks.write(batch, skip=skip)
         
-        if not filtered_subscribers:
-            self.console.print(f"[yellow]No subscribers found for {current_date.strftime('%Y-%m-%d')}")
+        # Pages are enriched and flushed to the sinks as they arrive
+        pipeline = DayPipeline(self.subscriber_fetcher, self.location_fetcher, self.referrer_info_fetcher,
+                               write_rows,
+                               chunk_size=sink_chunk_size,
+                               queue_size=pipeline_queue_pages,
+                               enrich_workers=enrich_workers,
+                               checkpoint=self.pagination_checkpoint,
+                               hourly=self.hourly_windows,
+                               sink_names=self.sinks.names)
+        closed = self.day_is_closed(current_date)
+        processed = await pipeline.run(day_start, day_end, session, write_after=write_after, closed=closed)
+        # A day still in progress (today, or a late one within the listing lag) is not complete however
+        # much of it was written; its checkpoint lets the next run pick up the rest
+        if closed:
+            self.completed_days.mark(current_date.strftime('%Y-%m-%d'))
+        reporter.finish_day(current_date.strftime('%Y-%m-%d'))
+        
+        if not processed:
+            reporter.info(f"No subscribers found for {current_date.strftime('%Y-%m-%d')}", style="yellow")
             return 0
         
-        subscriber_ids = [sub["id"] for sub in filtered_subscribers]
-        self.console.print(f"[bold yellow]Processing {len(subscriber_ids)} subscribers for {current_date.strftime('%Y-%m-%d')}...")
-        
-        locations_task = asyncio.create_task(
-            self.location_fetcher.fetch_all_locations(subscriber_ids, max_concurrent=3)
-        )
-        referrers_task = asyncio.create_task(
-            self.referrer_info_fetcher.fetch_all_referrer_info(subscriber_ids, max_concurrent=3)
-        )
-        
-        locations = await locations_task
-        referrers = await referrers_task
-        
-        for subscriber in filtered_subscribers:
-            sub_id = subscriber["id"]
-            if sub_id in locations:
-                location_data = locations[sub_id]
-                subscriber["location_state"] = location_data.get("state", "")
-                subscriber["location_country"] = location_data.get("country", "")
-            
-            if sub_id in referrers:
-                subscriber["referrer_info"] = referrers[sub_id]
-        
-        combined_data = DataMapper.combine_data(filtered_subscribers)
-        
-        # Submit to Google Sheets
-        column_order = [
-            "subscriber_created_at",
-            "subscriber_state",
-            "subscriber_email",
-            "referrer_name",
-            "referrer_domain",
-            "referrer_utm_source",
-            "referrer_utm_medium",
-            "referrer_utm_campaign",
-            "referrer_utm_content",
-            "subscriber_physical_state",
-            "subscriber_country",
-            "Subscriber Region",
-            "Subscriber Purchase Power",
-            "Subscriber Purchase Score"
-        ]
-        
-        self.console.print(f"[yellow]Submitting {len(filtered_subscribers)} records to Google Sheets for {current_date.strftime('%Y-%m-%d')}...")
-        self.spreadsheet_submitter.write_to_google_sheet(combined_data, column_order)
-        
-        self.console.print(f"[bold green]Successfully processed {len(filtered_subscribers)} subscribers for {current_date.strftime('%Y-%m-%d')}")
-        
-        return len(filtered_subscribers)
-
-    async def run(self, start_date_str=None, end_date_str=None):
-        """Main method to orchestrate the data collection and processing"""
-        start_time = time.time()
+        reporter.info(f"Successfully processed {processed} subscribers for {current_date.strftime('%Y-%m-%d')}", style="bold green")
+        
+        return processed
+
+    async def process_day_isolated(self, current_date, session, day_slots, write_after, written):
+        """Run one day under the parallel-days budget; a failure is reported and does not affect other days"""
+        try:
+            async with day_slots:
+                return await self.process_single_day(current_date, session, write_after=write_after)
+        except Exception as e:
+            reporter.error(f"Error processing {current_date.strftime('%Y-%m-%d')}: {e}")
+            return 0
+        finally:
+            # Let the next day write even if this one failed
+            written.set()
+
+    def incremental_window(self):
+        """
+        The window an incremental run fetches: from the high-water mark up to incremental_lag_seconds ago.
+
+        The first run starts at the beginning of yesterday, moved past any days the daily runs
+        have already completed, so it does not write their subscribers again. Today is never
+        skipped, since a daily run of the current day cannot have seen all of it.
+
+        Returns:
+            tuple: (window_start, window_end) datetimes; the start is after the end when there is nothing new yet.
+        """
+        if self.high_water_mark.created_at:
+            # One second of overlap whether or not created_after is inclusive; the mark's ids drop the repeats
+            window_start = datetime.strptime(self.high_water_mark.created_at, ISO_FORMAT).replace(tzinfo=timezone.utc) - timedelta(seconds=1)
+        else:
+            today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            window_start = today - timedelta(days=1)
+            while window_start < today and window_start.strftime('%Y-%m-%d') in self.completed_days:
+                window_start += timedelta(days=1)
+        window_end = (datetime.now(timezone.utc) - timedelta(seconds=incremental_lag_seconds)).replace(microsecond=0)
+        return window_start, window_end
+
+    async def process_incremental(self, window_start, window_end, session):
+        """
+        Process every subscriber created in the window that an earlier incremental run has not written
+
+        Returns:
+            int: Number of subscribers written; 0 if the run failed, leaving the mark where it was
+            (the chunks it did write stay recorded, so the next run skips them).
+        """
+        reporter.info(f"Processing subscribers created from {window_start.strftime(ISO_FORMAT)} to {window_end.strftime(ISO_FORMAT)}...", style="bold blue")
+        
+        async def write_rows(batch, skip=()):
+            reporter.debug(f"Submitting {len(batch)} records...")
+            return await self.sinks.write(batch, skip=skip)
+        
+        pipeline = DayPipeline(self.subscriber_fetcher, self.location_fetcher, self.referrer_info_fetcher,
+                               write_rows,
+                               chunk_size=sink_chunk_size,
+                               queue_size=pipeline_queue_pages,
+                               enrich_workers=enrich_workers,
+                               hourly=self.hourly_windows,
+                               high_water_mark=self.high_water_mark)
+        try:
+            processed = await pipeline.run(window_start.strftime(ISO_FORMAT), window_end.strftime(ISO_FORMAT), session)
+        except Exception as e:
+            reporter.error(f"Error processing incremental window: {e}")
+            return 0
+        reporter.finish_day(window_start.strftime('%Y-%m-%d'))
         
+        reporter.info(f"Successfully processed {processed} new subscribers; high-water mark is now {self.high_water_mark.created_at}", style="bold green")
+        return processed
+
+    def resolve_days(self, start_date_str=None, end_date_str=None, reprocess=False):
+        """
+        Work out the date range and the days in it that still need processing
+
+        Returns:
+            tuple: (start_date, end_date, days), or None if the dates could not be parsed.
+        """
         # Handle date range
         if start_date_str and end_date_str:
             try:
@@ -122,45 +309,170 @@ class AsyncMainRunner:
                 
                 # Calculate number of days
                 total_days = (end_date - start_date).days + 1
-                self.console.print(f"[bold cyan]Processing data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')} ({total_days} day(s))...")
+                reporter.info(f"Processing data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')} ({total_days} day(s))...", style="bold cyan")
             except ValueError as e:
-                self.console.print(f"[bold red]Error parsing dates: {e}")
-                self.console.print("[yellow]Please use format MM/DD/YYYY, DD/MM/YYYY, or YYYY-MM-DD")
-                return
+                reporter.error(f"Error parsing dates: {e}")
+                reporter.error("Please use format MM/DD/YYYY, DD/MM/YYYY, or YYYY-MM-DD")
+                return None
         else:
             # Default behavior: Yesterday's date
             start_date = (datetime.now(timezone.utc) - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
             end_date = start_date
             
-            self.console.print(f"[bold cyan]Processing data for {start_date.strftime('%Y-%m-%d')} (default: yesterday)...")
+            reporter.info(f"Processing data for {start_date.strftime('%Y-%m-%d')} (default: yesterday)...", style="bold cyan")
         
         
-        # Process each day individually
+        # Skip days a previous (possibly failed) run already wrote
+        days = []
         current_date = start_date
-        total_processed = 0
-        
         while current_date <= end_date:
-            try:
-                daily_count = await self.process_single_day(current_date)
-                total_processed += daily_count
-                
-                if current_date < end_date:
-                    await asyncio.sleep(1)
-                    
-            except Exception as e:
-                self.console.print(f"[bold red]Error processing {current_date.strftime('%Y-%m-%d')}: {e}")
-            
+            if reprocess or current_date.strftime('%Y-%m-%d') not in self.completed_days:
+                days.append(current_date)
+            else:
+                reporter.info(f"Skipping {current_date.strftime('%Y-%m-%d')}: already written", style="dim")
             current_date += timedelta(days=1)
+        return start_date, end_date, days
+
+    def dry_run(self, start_date_str=None, end_date_str=None, reprocess=False, incremental=False):
+        """
+        Report what a run would process and check its configuration, without fetching or writing
+
+        Returns:
+            bool: True when the health check passed.
+        """
+        if incremental:
+            window_start, window_end = self.incremental_window()
+            reporter.info(f"Dry run: subscribers created from {window_start.strftime(ISO_FORMAT)} to {window_end.strftime(ISO_FORMAT)}, "
+                          f"writing to {', '.join(self.sink_names)}", style="bold cyan")
+        else:
+            date_range = self.resolve_days(start_date_str, end_date_str, reprocess)
+            if date_range is None:
+                return False
+            _, _, days = date_range
+            reporter.info(f"Dry run: {len(days)} day(s) to process, writing to {', '.join(self.sink_names)}", style="bold cyan")
+            for day in days:
+                reporter.info(f"Would process {day.strftime('%Y-%m-%d')}")
+        
+        problems = self.health_check()
+        for problem in problems:
+            reporter.error(f"Health check: {problem}")
+        if not problems:
+            reporter.info("Health check passed", style="bold green")
+        return not problems
+
+    async def run(self, start_date_str=None, end_date_str=None, parallel_days=1, reprocess=False, incremental=False):
+        """
+        Main method to orchestrate the data collection and processing
+
+        Args:
+            start_date_str (str): First day of the range; defaults to yesterday.
+            end_date_str (str): Last day of the range; defaults to yesterday.
+            parallel_days (int): Number of days fetched and enriched concurrently.
+            reprocess (bool): Process days even if they are recorded as already written.
+            incremental (bool): Ignore the date range and process everything created since the high-water mark.
+        """
+        start_time = time.time()
+        
+        if incremental:
+            if not self.high_water_mark.acquire():
+                reporter.warning("Another incremental run is in progress; exiting")
+                return
+            start_date, end_date = self.incremental_window()
+            days = []
+            if start_date >= end_date:
+                reporter.info("Nothing new since the last incremental run", style="yellow")
+                self.high_water_mark.release()
+                return
+        else:
+            date_range = self.resolve_days(start_date_str, end_date_str, reprocess)
+            if date_range is None:
+                return
+            start_date, end_date, days = date_range
+        
+        # One pooled session for every fetcher, closed once all days are done.
+        # Days run concurrently under the shared per-host budgets but are written in date order.
+        day_slots = asyncio.Semaphore(max(1, parallel_days))
+        trace_configs = [self.connection_stats.trace_config(), run_metrics.trace_config()]
+        try:
+            async with build_session(trace_configs=trace_configs) as session:
+                if incremental:
+                    daily_counts = [await self.process_incremental(start_date, end_date, session)]
+                else:
+                    tasks = []
+                    previous_written = None
+                    for day in days:
+                        written = asyncio.Event()
+                        tasks.append(asyncio.create_task(
+                            self.process_day_isolated(day, session, day_slots, previous_written, written)
+                        ))
+                        previous_written = written
+                    daily_counts = await asyncio.gather(*tasks)
+        finally:
+            if incremental:
+                self.high_water_mark.release()
+        total_processed = sum(daily_counts)
+        
+        # End-of-run sink hooks (e.g. the delayed Supabase webhook) run while the summary prints
+        finalize_task = asyncio.create_task(self.sinks.finalize())
+        
+        if self._resolution_cache is not None:
+            self._resolution_cache.close()
+        if self._enrichment_cache is not None:
+            self._enrichment_cache.close()
         
         end_time = time.time()
         elapsed_time = end_time - start_time
-        self.console.print(f"[bold green]Process completed in {elapsed_time:.2f} seconds")
-        self.console.print(f"[bold green]Successfully processed {total_processed} total subscribers across all days")
+        reporter.close()
+        reporter.info(f"Process completed in {elapsed_time:.2f} seconds", style="bold green")
+        reporter.info(f"Successfully processed {total_processed} total subscribers across all days", style="bold green")
+        reporter.counter_summary()
+        reporter.info(f"HTTP: {self.connection_stats.summary()}", style="cyan")
+        for limiter in self.limiters.values():
+            reporter.info(limiter.summary(), style="cyan")
+        if self._resolution_cache is not None:
+            geo_stats = self._resolution_cache.stats()
+            reporter.info(f"Geo resolution cache: {geo_stats['hits']} hits, {geo_stats['misses']} misses ({geo_stats['hit_rate']:.1f}% hit rate)", style="cyan")
+        if self._enrichment_cache is not None:
+            reporter.info(f"Enrichment cache: {self._enrichment_cache.summary()}", style="cyan")
+        reporter.info(f"Request coalescing: {self.single_flight.summary()}", style="cyan")
+        reporter.info(f"UTM fallback fields: {self.fields_lookup.summary()}", style="cyan")
+        for line in self.sinks.summary():
+            reporter.info(f"Sink {line}", style="cyan")
+        for line in run_metrics.summary():
+            reporter.info(f"Stage {line}", style="cyan")
+        
+        run_info = {
+            "start_date": start_date.strftime('%Y-%m-%d'),
+            "end_date": end_date.strftime('%Y-%m-%d'),
+            "days": len(days),
+            "incremental": incremental,
+            "elapsed_seconds": round(elapsed_time, 3),
+            "subscribers_processed": total_processed,
+            "duplicate_requests_suppressed": self.single_flight.suppressed(),
+            "fields_lookups_by_id": self.fields_lookup.by_id,
+        }
+        if self.report_path:
+            run_metrics.write_json(self.report_path, **run_info)
+            reporter.info(f"Run report written to {self.report_path}", style="cyan")
+        if self.prometheus_path:
+            run_metrics.write_prometheus(self.prometheus_path, **run_info)
+        
+        await finalize_task
 
 
-async def main(start_date_str=None, end_date_str=None):
-    runner = AsyncMainRunner()
-    await runner.run(start_date_str, end_date_str)
+async def main(start_date_str=None, end_date_str=None, parallel_days=1, reprocess=False,
+               log_level=log_level, log_format=log_format, dry_run=False, incremental=False, **runner_options):
+    """
+    Returns:
+        bool: False when a dry run's health check failed.
+    """
+    reporter.configure(level=log_level, mode=log_format, progress_interval=log_progress_interval)
+    runner = AsyncMainRunner(**runner_options)
+    if dry_run:
+        return runner.dry_run(start_date_str, end_date_str, reprocess=reprocess, incremental=incremental)
+    await runner.run(start_date_str, end_date_str, parallel_days=parallel_days, reprocess=reprocess,
+                     incremental=incremental)
+    return True
 
 if __name__ == "__main__":
 # 1. Initialize the Argument Parser
@@ -169,9 +481,50 @@ if __name__ == "__main__":
     # 2. Add the optional arguments
     parser.add_argument("--start_date", type=str, help="Start date in dd/mm/yyyy format", default=None)
     parser.add_argument("--end_date", type=str, help="End date in dd/mm/yyyy format", default=None)
+    parser.add_argument("--api_max_concurrent", type=int, help="Upper bound on concurrent api.kit.com requests", default=None)
+    parser.add_argument("--app_max_concurrent", type=int, help="Upper bound on concurrent app.kit.com requests", default=None)
+    parser.add_argument("--max_retries", type=int, help="Retries for throttled or failed requests", default=None)
+    parser.add_argument("--parallel_days", type=int, help="Number of days to process concurrently", default=parallel_days)
+    parser.add_argument("--reprocess", action="store_true", help="Process days even if they were already written")
+    parser.add_argument("--hourly_windows", action="store_true", default=pagination_hourly_windows,
+                        help="Paginate each day as concurrent hourly sub-windows")
+    parser.add_argument("--sinks", type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+                        default=default_sinks, help="Comma-separated sinks: sheets,supabase,csv,parquet")
+    parser.add_argument("--cache_ttl_days", type=float, default=enrichment_cache_ttl_days,
+                        help="Ignore cached location/referrer results older than this many days")
+    parser.add_argument("--report_path", type=str, default=metrics_report_path,
+                        help="Where to write the JSON run report (stage timings, per-host request metrics)")
+    parser.add_argument("--prometheus_path", type=str, default=metrics_prometheus_path,
+                        help="Also write the metrics in Prometheus text format to this path")
+    parser.add_argument("--log_level", choices=["debug", "info", "warning", "error"], default=log_level,
+                        help="Lowest level printed; per-request detail is logged at debug")
+    parser.add_argument("--log_format", choices=["auto", "rich", "plain", "json"], default=log_format,
+                        help="rich draws live progress bars; plain/json print periodic summaries (auto: rich on a terminal, json otherwise)")
+    parser.add_argument("--refresh_cache", action="store_true",
+                        help="Refetch location/referrer info for every subscriber and overwrite the cache")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Process subscribers created since the last incremental run instead of whole days")
+    parser.add_argument("--dry_run", action="store_true",
+                        help="List the days that would be processed and check the configuration, without fetching or writing")
     
     # 3. Parse the arguments from the command line
     args = parser.parse_args()
     
     # 4. Run the async main with the provided args
-    asyncio.run(main(start_date_str=args.start_date, end_date_str=args.end_date))
\ No newline at end of file
+    ok = asyncio.run(main(start_date_str=args.start_date, end_date_str=args.end_date,
+                          parallel_days=args.parallel_days,
+                          reprocess=args.reprocess,
+                          log_level=args.log_level,
+                          log_format=args.log_format,
+                          api_max_concurrent=args.api_max_concurrent,
+                          app_max_concurrent=args.app_max_concurrent,
+                          max_retries=args.max_retries,
+                          hourly_windows=args.hourly_windows,
+                          sinks=args.sinks,
+                          cache_ttl_days=args.cache_ttl_days,
+                          refresh_cache=args.refresh_cache,
+                          report_path=args.report_path,
+                          prometheus_path=args.prometheus_path,
+                          dry_run=args.dry_run,
+                          incremental=args.incremental))
+    sys.exit(0 if ok else 1)
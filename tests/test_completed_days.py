@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from main import AsyncMainRunner
+from utils.run_state import CompletedDays
+
+
+class FakePipeline:
+    runs = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run(self, day_start, day_end, session, write_after=None, closed=True):
+        FakePipeline.runs.append((day_start, closed))
+        return 1
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DayPipeline", FakePipeline)
+    FakePipeline.runs = []
+    runner = SimpleNamespace(subscriber_fetcher=None, location_fetcher=None, referrer_info_fetcher=None, sinks=SimpleNamespace(names=[]),
+                             pagination_checkpoint=None, hourly_windows=False,
+                             completed_days=CompletedDays(str(tmp_path / "completed_days.json")),
+                             day_is_closed=AsyncMainRunner.day_is_closed)
+    runner.parse_date = partial(AsyncMainRunner.parse_date, runner)
+    return runner
+
+
+def midnight(days_ago):
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days_ago)
+
+
+def test_day_is_closed():
+    assert AsyncMainRunner.day_is_closed(midnight(2))
+    assert not AsyncMainRunner.day_is_closed(midnight(0))
+    assert not AsyncMainRunner.day_is_closed(midnight(-1))
+    assert AsyncMainRunner.day_is_closed(midnight(2).replace(tzinfo=None))
+
+
+def test_today_is_not_marked_written(runner):
+    for days_ago in (2, 0):
+        asyncio.run(AsyncMainRunner.process_single_day(runner, midnight(days_ago), session=None))
+
+    assert midnight(2).strftime("%Y-%m-%d") in runner.completed_days
+    assert midnight(0).strftime("%Y-%m-%d") not in runner.completed_days
+    # Today's run keeps its checkpoint for the next run to resume from
+    assert [closed for _, closed in FakePipeline.runs] == [True, False]
+
+    # The next nightly run still processes the day that was today
+    today = midnight(0).strftime("%Y-%m-%d")
+    _, _, days = AsyncMainRunner.resolve_days(runner, today, today)
+    assert days == [midnight(0)]
@@ -0,0 +1,86 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from utils import enrichment_cache as enrichment_cache_module
+from utils.enrichment_cache import EnrichmentCache
+from utils.location_fetcher import LocationFetcher
+
+from tests.conftest import FakeLimiter, FakeResponse
+
+LOGIN_PAGE = b"<html><body><form action='/users/login'><input name='email'></form></body></html>"
+SUBSCRIBER_PAGE = b'<html><body><div class="subscriber-location" data-city="Austin" data-state="Texas"></div></body></html>'
+NO_LOCATION_PAGE = b'<html><body><div data-city="" data-state=""></div></body></html>'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(enrichment_cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_entry_ttl_expires_before_cache_ttl(clock):
+    cache = EnrichmentCache(ttl_days=None)
+    cache.put("location", 1, {"city": None, "state": None}, ttl_days=1)
+    cache.put("location", 2, {"city": "Austin", "state": "Texas"})
+    assert cache.get("location", 1) is not None
+    cache.flush()
+    assert cache.get("location", 1) is not None
+
+    clock[0] += 2 * 86400
+    assert cache.get("location", 1) is None
+    assert cache.get("location", 2) == {"city": "Austin", "state": "Texas"}
+
+
+def test_cache_ttl_still_applies(clock):
+    cache = EnrichmentCache(ttl_days=1)
+    cache.put("referrer", 1, {"origin": {}}, ttl_days=30)
+    clock[0] += 2 * 86400
+    assert cache.get("referrer", 1) is None
+
+
+def test_caches_without_expires_at_are_migrated(tmp_path):
+    db_path = str(tmp_path / "enrichment_cache.sqlite3")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE enrichment (kind TEXT NOT NULL, subscriber_id TEXT NOT NULL, payload TEXT NOT NULL, "
+                 "fetched_at REAL NOT NULL, PRIMARY KEY (kind, subscriber_id))")
+    conn.execute("INSERT INTO enrichment VALUES ('location', '1', '{\"city\": \"Lagos\", \"state\": \"Lagos\"}', ?)",
+                 (time.time(),))
+    conn.commit()
+    conn.close()
+
+    cache = EnrichmentCache(db_path)
+    assert cache.get("location", 1) == {"city": "Lagos", "state": "Lagos"}
+    cache.put("location", 2, {"city": None, "state": None}, ttl_days=1)
+    cache.close()
+    assert EnrichmentCache(db_path).get("location", 2) == {"city": None, "state": None}
+
+
+def scrape(body, clock):
+    cache = EnrichmentCache()
+    fetcher = LocationFetcher(limiter=FakeLimiter(FakeResponse(body=body)), enrichment_cache=cache, negative_ttl_days=1)
+    result = asyncio.run(fetcher.scrape_location(None, 1))
+    return result, cache
+
+
+def test_login_page_is_only_cached_briefly(clock):
+    result, cache = scrape(LOGIN_PAGE, clock)
+    assert result == (None, None)
+    assert cache.get("location", 1) == {"city": None, "state": None}
+    clock[0] += 2 * 86400
+    assert cache.get("location", 1) is None
+
+
+@pytest.mark.parametrize("body, expected", [
+    (SUBSCRIBER_PAGE, ("Austin", "Texas")),
+    # The element is there but empty: the subscriber has no location, which is final
+    (NO_LOCATION_PAGE, ("", "")),
+])
+def test_found_locations_are_cached_for_good(clock, body, expected):
+    result, cache = scrape(body, clock)
+    assert result == expected
+    clock[0] += 365 * 86400
+    assert cache.get("location", 1) == {"city": expected[0], "state": expected[1]}
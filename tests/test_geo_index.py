@@ -0,0 +1,146 @@
+import itertools
+import json
+import os
+import shutil
+
+import pytest
+
+from utils.geo_index import GeoIndex, normalize
+from utils.geo_snapshot import snapshot_path_for
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "Countries Metadata.json")
+
+
+class LegacyScanner:
+    """The four-phase nested scanner and Handler the index replaced, kept as the reference."""
+
+    def __init__(self, countries):
+        self.countries = countries
+
+    def search(self, city, state):
+        if not city and not state:
+            return "N/A"
+
+        candidate_countries = set()
+        exact_match_country = None
+
+        # Phase 1: Check for capital city match
+        for country in self.countries:
+            if city and city == country.get('capital', '').lower().strip():
+                return country['name']
+
+        # Phase 2: Preprocess and match city and state together
+        for country in self.countries:
+            for state_entry in country.get('states', []):
+                state_name = state_entry['name'].lower().strip()
+                for city_entry in state_entry.get('cities', []):
+                    city_name = city_entry['name'].lower().strip()
+                    if city == city_name and state == state_name:
+                        exact_match_country = country['name']
+                        break
+                    if city == city_name:
+                        candidate_countries.add(country['name'])
+            if exact_match_country:
+                break
+
+        if exact_match_country:
+            return exact_match_country
+
+        # Phase 3: Narrow down candidates using state
+        if state and len(candidate_countries) > 1:
+            narrowed_candidates = {
+                country['name'] for country in self.countries
+                for state_entry in country.get('states', [])
+                if state == state_entry['name'].lower().strip() and country['name'] in candidate_countries
+            }
+            if len(narrowed_candidates) == 1:
+                return narrowed_candidates.pop()
+
+        # Phase 4: Fallback to state-based lookup
+        if state:
+            for country in self.countries:
+                for state_entry in country.get('states', []):
+                    if state == state_entry['name'].lower().strip():
+                        return country['name']
+
+        return "N/A"
+
+    def handle(self, city):
+        for country in self.countries:
+            if city and city == country.get('capital', '').lower().strip():
+                return country['name']
+            for state_entry in country.get('states', []):
+                for city_entry in state_entry.get('cities', []):
+                    if city and city == city_entry['name'].lower().strip():
+                        return country['name']
+        return "N/A"
+
+
+@pytest.fixture(scope="module")
+def countries():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    # The snapshot is written next to the JSON, so compile a copy
+    json_path = str(tmp_path_factory.mktemp("geo") / "Countries Metadata.json")
+    shutil.copyfile(FIXTURE, json_path)
+    index = GeoIndex.from_json(json_path)
+    assert os.path.exists(snapshot_path_for(json_path))
+    return index
+
+
+def place_names(countries):
+    cities, states = set(), set()
+    for country in countries:
+        cities.add(country["capital"])
+        for state in country.get("states", []):
+            states.add(state["name"])
+            cities.update(city["name"] for city in state.get("cities", []))
+    return sorted(cities | {"Atlantis", "  RIVERTON "}), sorted(states | {"Nowhere", " north"})
+
+
+def test_search_matches_legacy_scanner(countries, index):
+    legacy = LegacyScanner(countries)
+    cities, states = place_names(countries)
+    pairs = list(itertools.product(cities + [None, ""], states + [None, ""]))
+    for raw_city, raw_state in pairs:
+        city, state = normalize(raw_city), normalize(raw_state)
+        assert index.search(city, state) == legacy.search(city, state), (raw_city, raw_state)
+
+
+def test_handle_matches_legacy_handler(countries, index):
+    legacy = LegacyScanner(countries)
+    cities, _ = place_names(countries)
+    for raw_city in cities + [None, ""]:
+        city = normalize(raw_city)
+        assert index.handle(city) == legacy.handle(city), raw_city
+
+
+@pytest.mark.parametrize("city, state, expected", [
+    # A capital wins over an exact city/state match elsewhere
+    ("springfield", "eastern", "Aland"),
+    # Shared city name: the exact city/state pair decides
+    ("riverton", "west", "Carpania"),
+    ("riverton", "north", "Aland"),
+    # Shared city name narrowed to the only candidate that has the state
+    ("riverton", "sierra", "Dorado"),
+    # Several candidates have the state: falls back to its first country
+    ("riverton", "plains", "Borduria"),
+    # State-only fallback
+    (None, "lone state", "Carpania"),
+    ("atlantis", "west", "Carpania"),
+    ("atlantis", "nowhere", "N/A"),
+    (None, None, "N/A"),
+])
+def test_search_cases(index, city, state, expected):
+    assert index.search(city, state) == expected
+
+
+def test_handle_cases(index):
+    assert index.handle("port royal") == "Aland"
+    assert index.handle("kragz") == "Borduria"
+    assert index.handle("el oro") == "Dorado"
+    assert index.handle("atlantis") == "N/A"
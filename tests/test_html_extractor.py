@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from bs4 import BeautifulSoup
+
+from utils import html_extractor
+from utils.html_extractor import LocationExtractor, extract_location_from_response
+from utils.location_fetcher import LocationFetcher
+
+from tests.conftest import FakeResponse
+
+EDGE_CASES = [
+    '<div class="subscriber-location" data-city="Austin" data-state="Texas"></div>',
+    '<DIV DATA-CITY="Austin" Data-State="Texas"></DIV>',
+    '<!-- <div data-city="Fake" data-state="Comment"> --><div data-city="Lagos" data-state="Lagos"></div>',
+    '<script>var s = \'<div data-city="Fake" data-state="Script">\';</script><p>none</p>',
+    '<div data-city="S&atilde;o Paulo" data-state="S&#227;o Paulo"></div>',
+    '<div data-city data-state></div>',
+    '<div data-city="First" data-city="Second" data-state="Texas"></div>',
+    '<div data-city="Austin" data-state="Tex',
+    '<span data-city="Only city"></span>',
+    '<html><body><form action="/users/login"><input name="email"></form></body></html>',
+    '',
+]
+
+
+def beautifulsoup_location(html):
+    element = BeautifulSoup(html, "html.parser").find(attrs={"data-city": True, "data-state": True})
+    return (element["data-city"], element["data-state"]) if element else None
+
+
+def stream_location(html, chunk_size=7):
+    extractor = LocationExtractor()
+    data = html.encode("utf-8")
+    for start in range(0, len(data), chunk_size):
+        if extractor.feed(data[start:start + chunk_size]):
+            return extractor.location
+    return extractor.finish()
+
+
+@pytest.mark.parametrize("html", EDGE_CASES)
+def test_streaming_parser_agrees_with_beautifulsoup(html):
+    assert stream_location(html) == beautifulsoup_location(html)
+
+
+def extract(html, monkeypatch):
+    fallbacks = []
+    fetcher = LocationFetcher()
+    monkeypatch.setattr(fetcher, "clean_response", lambda page: fallbacks.append(page) or ("Bs4", "Bs4"))
+    return asyncio.run(fetcher.extract_location(FakeResponse(body=html.encode("utf-8")))), fallbacks
+
+
+def test_page_without_location_is_parsed_once(monkeypatch):
+    assert extract(EDGE_CASES[-2], monkeypatch) == ((None, None), [])
+
+
+def test_beautifulsoup_only_runs_when_the_parser_failed(monkeypatch):
+    def choke(self, data):
+        raise AssertionError("parser error")
+
+    monkeypatch.setattr(html_extractor.LocationAttributeParser, "feed", choke)
+    location, fallbacks = extract(EDGE_CASES[0], monkeypatch)
+    assert location == ("Bs4", "Bs4") and fallbacks == [EDGE_CASES[0]]
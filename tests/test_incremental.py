@@ -0,0 +1,95 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from main import AsyncMainRunner
+from tests.conftest import PIPELINE_WINDOW
+from utils.run_state import CompletedDays, HighWaterMark
+
+
+def subscriber(i, created_at=None):
+    return {"id": i, "created_at": created_at or f"2025-01-15T00:00:{i:02d}Z"}
+
+
+class FlakySink:
+    """Collects written ids; the write numbered fail_on raises once."""
+
+    def __init__(self, fail_on=None):
+        self.ids = []
+        self.writes = 0
+        self.fail_on = fail_on
+
+    async def write(self, batch, skip=()):
+        self.writes += 1
+        if self.writes == self.fail_on:
+            raise RuntimeError("sink down")
+        self.ids.extend(subscriber["id"] for subscriber in batch)
+
+
+def run_window(make_pipeline, subscribers, mark, sink):
+    pipeline = make_pipeline(subscribers, sink.write, chunk_size=3, enrich_workers=1, high_water_mark=mark)
+    return asyncio.run(pipeline.run(*PIPELINE_WINDOW, session=None))
+
+
+def test_retry_after_partial_failure_writes_each_subscriber_once(tmp_path, make_pipeline):
+    path = str(tmp_path / "high_water_mark.json")
+    subscribers = [subscriber(i) for i in range(10)]
+
+    sink = FlakySink(fail_on=3)
+    with pytest.raises(RuntimeError):
+        run_window(make_pipeline, subscribers, HighWaterMark(path), sink)
+    first_run = list(sink.ids)
+    assert first_run and len(first_run) < len(subscribers)
+
+    # A fresh process reads what the failed run recorded
+    mark = HighWaterMark(path)
+    assert mark.created_at is None and set(mark.written) == set(first_run)
+
+    sink.fail_on = None
+    run_window(make_pipeline, subscribers, mark, sink)
+    assert sorted(sink.ids) == list(range(10))
+    assert mark.created_at == "2025-01-15T00:00:09Z" and mark.ids == {9} and mark.written == {}
+
+    # Nothing is left for a rerun of the same window
+    before = len(sink.ids)
+    assert run_window(make_pipeline, subscribers, HighWaterMark(path), sink) == 0
+    assert len(sink.ids) == before
+
+
+def test_mark_keeps_every_id_of_its_second(tmp_path):
+    path = str(tmp_path / "high_water_mark.json")
+    last_second = "2025-01-15T00:00:30Z"
+    mark = HighWaterMark(path)
+    mark.record([subscriber(1, last_second)])
+    mark = HighWaterMark(path)
+    mark.record([subscriber(2, last_second), subscriber(3, "2025-01-15T00:00:10Z")])
+    mark.advance()
+    assert (mark.created_at, mark.ids, mark.written) == (last_second, {1, 2}, {})
+    with open(path) as f:
+        assert json.load(f) == {"created_at": last_second, "ids": [1, 2], "written": []}
+    assert mark.is_emitted(subscriber(1, last_second))
+    assert not mark.is_emitted(subscriber(4, last_second))
+    assert not mark.is_emitted(subscriber(5, "2025-01-15T00:00:31Z"))
+
+
+def first_window_start(completed):
+    days = CompletedDays(None)
+    for day in completed:
+        days.mark(day)
+    runner = SimpleNamespace(high_water_mark=HighWaterMark(None), completed_days=days)
+    return AsyncMainRunner.incremental_window(runner)[0]
+
+
+def test_first_window_starts_after_completed_days():
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    day = lambda d: d.strftime("%Y-%m-%d")
+
+    assert first_window_start([]) == yesterday
+    assert first_window_start([day(yesterday - timedelta(days=1))]) == yesterday
+    assert first_window_start([day(yesterday)]) == today
+    # A completed today is not trusted: the daily run cannot have seen all of it
+    assert first_window_start([day(yesterday), day(today)]) == today
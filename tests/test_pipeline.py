@@ -0,0 +1,83 @@
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+from tests.conftest import PIPELINE_WINDOW
+from utils.run_state import PaginationCheckpoint
+from utils.sinks import Sink, SinkFanout, SinkWriteError
+
+WINDOW_KEY = "|".join(PIPELINE_WINDOW)
+SUBSCRIBERS = [{"id": i, "created_at": f"2025-01-15T00:00:{i:02d}Z"} for i in range(14)]
+
+
+class RecordingSink(Sink):
+    """Counts the ids written to it; the write numbered fail_on raises."""
+
+    def __init__(self, name, fail_on=None):
+        self.name = name
+        self.fail_on = fail_on
+        self.writes = 0
+        self.ids = Counter()
+
+    def write(self, batch):
+        self.writes += 1
+        if self.writes == self.fail_on:
+            raise RuntimeError(f"{self.name} down")
+        self.ids.update(subscriber["id"] for subscriber in batch)
+
+
+def run_day(make_pipeline, checkpoint, sinks):
+    fanout = SinkFanout(sinks, retries=0)
+    pipeline = make_pipeline(SUBSCRIBERS, fanout.write, per_page=4, chunk_size=3, enrich_workers=3,
+                             checkpoint=checkpoint, sink_names=fanout.names)
+    return asyncio.run(pipeline.run(*PIPELINE_WINDOW, session=None))
+
+
+@pytest.mark.parametrize("fail_on", [
+    {"sheets": 3, "supabase": 3},
+    # One sink accepts the chunk the other fails
+    {"sheets": 3},
+    {"supabase": 2},
+])
+def test_resume_writes_each_row_once_per_sink(tmp_path, make_pipeline, fail_on):
+    path = str(tmp_path / "pagination_checkpoint.json")
+    sinks = [RecordingSink(name, fail_on.get(name)) for name in ("sheets", "supabase")]
+
+    with pytest.raises(SinkWriteError):
+        run_day(make_pipeline, PaginationCheckpoint(path), sinks)
+    assert any(sink.ids for sink in sinks)
+
+    # A fresh process resumes from the saved cursor and recorded ids
+    checkpoint = PaginationCheckpoint(path)
+    run_day(make_pipeline, checkpoint, sinks)
+    for sink in sinks:
+        assert sink.ids == Counter(range(len(SUBSCRIBERS))), sink.name
+
+    # The finished day leaves nothing behind
+    finished = PaginationCheckpoint(path)
+    assert finished.get(WINDOW_KEY) is None and finished.written_to(WINDOW_KEY, 0) == set()
+
+
+def test_cursor_only_covers_fully_written_pages(tmp_path, make_pipeline):
+    path = str(tmp_path / "pagination_checkpoint.json")
+    sinks = [RecordingSink("csv", fail_on=3)]
+    with pytest.raises(SinkWriteError):
+        run_day(make_pipeline, PaginationCheckpoint(path), sinks)
+
+    checkpoint = PaginationCheckpoint(path)
+    written = set(sinks[0].ids)
+    cursor = int(checkpoint.get(WINDOW_KEY) or 0)
+    # Every page before the cursor is fully written, and every written id is recorded for the resume
+    assert set(range(cursor)) <= written
+    assert written - set(range(cursor))
+    assert all(checkpoint.written_to(WINDOW_KEY, i) == {"csv"} for i in written)
+
+
+def test_old_checkpoint_files_are_read(tmp_path):
+    path = tmp_path / "pagination_checkpoint.json"
+    path.write_text(json.dumps({WINDOW_KEY: "8"}))
+    checkpoint = PaginationCheckpoint(str(path))
+    assert checkpoint.get(WINDOW_KEY) == "8"
+    assert checkpoint.written_to(WINDOW_KEY, 1) == set()
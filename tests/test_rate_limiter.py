@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from utils.rate_limiter import AdaptiveLimiter
+
+
+class FailingSession:
+    """Session whose requests raise `error`, or hang until cancelled when it is None."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    async def request(self, method, url, **kwargs):
+        self.calls += 1
+        if self.error is None:
+            await asyncio.Event().wait()
+        raise self.error
+
+
+async def make_request(limiter, session):
+    async with limiter.request(session, "GET", "http://example.invalid/"):
+        pass
+
+
+def test_non_retryable_error_releases_slot():
+    async def scenario():
+        limiter = AdaptiveLimiter("test", initial=3, maximum=3, max_retries=2, backoff_base=0)
+        session = FailingSession(ValueError("boom"))
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                await make_request(limiter, session)
+        return limiter, session
+
+    limiter, session = asyncio.run(scenario())
+    assert limiter._in_flight == 0
+    # Not retried: only RETRYABLE_EXCEPTIONS are
+    assert session.calls == 5
+
+
+def test_cancellation_releases_slot():
+    async def scenario():
+        limiter = AdaptiveLimiter("test", initial=3, maximum=3, max_retries=2, backoff_base=0)
+        session = FailingSession()
+        tasks = [asyncio.create_task(make_request(limiter, session)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert limiter._in_flight == 3
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return limiter
+
+    assert asyncio.run(scenario())._in_flight == 0
+
+
+def test_retryable_error_is_retried_then_released():
+    async def scenario():
+        limiter = AdaptiveLimiter("test", initial=3, maximum=3, max_retries=2, backoff_base=0)
+        session = FailingSession(asyncio.TimeoutError())
+        with pytest.raises(asyncio.TimeoutError):
+            await make_request(limiter, session)
+        return limiter, session
+
+    limiter, session = asyncio.run(scenario())
+    assert session.calls == 3
+    assert limiter.retries == 2 and limiter.failures == 1
+    assert limiter._in_flight == 0
@@ -0,0 +1,28 @@
+from utils.reporter import Reporter
+
+
+def test_counter_summary_warns_only_for_failures(capsys):
+    reporter = Reporter(level="info", mode="plain")
+    reporter.count("duplicate subscribers skipped", 3)
+    reporter.count("location fetches failed", failure=True)
+    reporter.count("location fetches failed", failure=True)
+
+    reporter.counter_summary()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(" ", 2)[2] for line in lines] == [
+        "INFO duplicate subscribers skipped: 3",
+        "WARNING location fetches failed: 2",
+    ]
+
+
+def test_counter_summary_hides_routine_counters_below_warning(capsys):
+    reporter = Reporter(level="warning", mode="plain")
+    reporter.count("subscribers skipped as already written", 5)
+    reporter.count("referrer fetches failed", failure=True)
+
+    reporter.counter_summary()
+
+    out = capsys.readouterr().out
+    assert "already written" not in out
+    assert "WARNING referrer fetches failed: 1" in out
@@ -0,0 +1,33 @@
+import importlib.util
+
+import pytest
+
+from main import AsyncMainRunner
+from utils.sinks import CsvSink, ParquetSink
+
+
+def installed(monkeypatch, *modules):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *args: find_spec("json") if name in modules else None)
+
+
+@pytest.mark.parametrize("modules, problem", [
+    (("pandas", "pyarrow"), None),
+    (("pandas", "fastparquet"), None),
+    (("pandas",), "pyarrow or fastparquet"),
+    ((), "needs pandas"),
+])
+def test_parquet_sink_reports_a_missing_engine(monkeypatch, modules, problem):
+    installed(monkeypatch, *modules)
+    problems = ParquetSink().problems()
+    if problem is None:
+        assert problems == []
+    else:
+        assert len(problems) == 1 and problem in problems[0]
+
+
+def test_health_check_includes_sink_problems(monkeypatch):
+    installed(monkeypatch, "pandas")
+    runner = AsyncMainRunner(sinks=["csv", "parquet"])
+    assert CsvSink().problems() == []
+    assert any("parquet sink" in problem for problem in runner.health_check())
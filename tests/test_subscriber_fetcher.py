@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from utils.rate_limiter import AdaptiveLimiter
+from utils.subscriber_fetcher import SubscriberFetcher
+
+from tests.conftest import FakeResponse
+
+PARAMS = {"created_after": "2025-01-15T00:00:00Z", "created_before": "2025-01-15T23:59:59Z", "per_page": 500}
+
+
+class ScriptedSession:
+    """Answers requests with the given statuses in turn, repeating the last one."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    async def request(self, method, url, **kwargs):
+        status = self.statuses[min(self.calls, len(self.statuses) - 1)]
+        self.calls += 1
+        return FakeResponse(status, {"subscribers": [], "pagination": {}})
+
+
+def fetch_page(session):
+    limiter = AdaptiveLimiter("api.kit.com", max_retries=2, backoff_base=0)
+    fetcher = SubscriberFetcher(base_url="http://kit.invalid/v4", limiter=limiter)
+    return asyncio.run(fetcher.fetch_page(session, dict(PARAMS)))
+
+
+def test_failing_page_is_only_retried_by_the_limiter():
+    session = ScriptedSession(500)
+    with pytest.raises(RuntimeError, match="Status code: 500"):
+        fetch_page(session)
+    assert session.calls == 3
+
+
+def test_client_error_is_not_retried():
+    session = ScriptedSession(401)
+    with pytest.raises(RuntimeError, match="Status code: 401"):
+        fetch_page(session)
+    assert session.calls == 1
+
+
+def test_page_recovers_within_limiter_retries():
+    session = ScriptedSession(503, 429, 200)
+    assert fetch_page(session) == {"subscribers": [], "pagination": {}}
+    assert session.calls == 3
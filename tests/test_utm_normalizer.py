@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from utils.helpers import extract_utms
+from utils.referrer_fetcher import ReferrerInfoFetcher
+from utils.utm_normalizer import UtmNormalizer, normalizer
+
+from tests.conftest import FakeLimiter, FakeResponse
+
+
+def subscriber_data(source=None, medium=None, campaign=None, content=None):
+    return {"subscriber": {"fields": {"utm_source": source, "utm_medium": medium,
+                                      "utm_campaign": campaign, "utm_content": content}}}
+
+
+def test_extract_utms_return_order():
+    assert extract_utms(subscriber_data("newsletter", "email", "spring", "header")) == \
+        ("newsletter", "email", "spring", "header")
+
+
+def test_missing_and_null_fields_become_empty():
+    assert extract_utms({"subscriber": {"fields": {}}}) == ("", "", "", "")
+    assert extract_utms(subscriber_data()) == ("", "", "", "")
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("fb", "facebook-ads"),
+    ("120238339349620295", "facebook-ads"),
+    ("ad 12345678901 copy", "facebook-ads"),
+    # Ten digits is not an ad id
+    ("1234567890", "1234567890"),
+    ("fb.com", "fb.com"),
+    ("google", "google"),
+])
+def test_facebook_sources(source, expected):
+    assert extract_utms(subscriber_data(source=source))[0] == expected
+
+
+@pytest.mark.parametrize("medium, campaign, expected_medium, expected_campaign", [
+    # A campaign holding an ad id is the Facebook label, and the medium is left alone
+    ("paid", "12345678901", "paid", "facebook-ads"),
+    ("email", "launch 120240689174560295", "email", "facebook-ads"),
+    ("paid", "1234567890", "paid-ads", "1234567890"),
+    # Otherwise a known paid campaign medium becomes the paid label
+    ("paid", "launch", "paid-ads", "launch"),
+    ("Bid Cap Graveyard | Static", None, "paid-ads", ""),
+    ("email", "launch", "email", "launch"),
+    # Matching is exact
+    ("Paid", "launch", "Paid", "launch"),
+])
+def test_campaign_id_and_paid_mediums(medium, campaign, expected_medium, expected_campaign):
+    _, medium, campaign, _ = extract_utms(subscriber_data("newsletter", medium, campaign))
+    assert (medium, campaign) == (expected_medium, expected_campaign)
+
+
+def test_rules_come_from_the_constructor():
+    custom = UtmNormalizer(ad_id_pattern=r"^id-\d+$", facebook_sources=["meta"], paid_mediums=["cpc"],
+                           facebook_label="FB", paid_label="PAID")
+    assert custom.normalize("meta", "cpc", "id-7", "x") == {"source": "FB", "medium": "cpc", "campaign": "FB", "content": "x"}
+    assert custom.normalize("id-1", "cpc", "launch", None) == {"source": "FB", "medium": "PAID", "campaign": "launch", "content": ""}
+    assert normalizer.normalize("meta", "cpc", "id-7", "x")["source"] == "meta"
+
+
+class FakeFieldsLookup:
+    def __init__(self, fields):
+        self.fields_by_id = fields
+        self.calls = []
+
+    async def fields(self, session, subscriber_id, listed_fields=None):
+        self.calls.append((subscriber_id, listed_fields))
+        return listed_fields if listed_fields is not None else self.fields_by_id
+
+
+def fetch_referrer(referrer_utm, fields, listed_fields=None):
+    lookup = FakeFieldsLookup(fields)
+    response = FakeResponse(payload={"origin": {"name": "Form"}, "referrer_utm": referrer_utm})
+    fetcher = ReferrerInfoFetcher(headers={}, limiter=FakeLimiter(response), fields_lookup=lookup)
+    _, info = asyncio.run(fetcher.fetch_referrer_info(None, 1, listed_fields))
+    return info["referrer_utm"], lookup.calls
+
+
+def test_referrer_fallback_keeps_campaign_and_content_apart():
+    fields = {"utm_source": "newsletter", "utm_medium": "email", "utm_campaign": "spring", "utm_content": "header"}
+    utm, calls = fetch_referrer({"source": "", "medium": "", "campaign": "", "content": ""}, fields)
+    assert utm == {"source": "newsletter", "medium": "email", "campaign": "spring", "content": "header"}
+    assert calls == [(1, None)]
+
+
+def test_referrer_fallback_prefers_listed_fields():
+    listed = {"utm_source": "fb", "utm_medium": "paid", "utm_campaign": "launch", "utm_content": None}
+    utm, calls = fetch_referrer({"source": "", "medium": "", "campaign": "", "content": ""}, {}, listed)
+    assert utm == {"source": "facebook-ads", "medium": "paid-ads", "campaign": "launch", "content": ""}
+    assert calls == [(1, listed)]
+
+
+def test_referrer_utms_are_kept_when_the_source_is_set():
+    referrer_utm = {"source": "ig", "medium": "social", "campaign": "launch", "content": "story"}
+    utm, calls = fetch_referrer(dict(referrer_utm), {"utm_source": "fb"})
+    assert utm == referrer_utm
+    assert calls == []
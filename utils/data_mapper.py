@@ -1,7 +1,11 @@
-from datetime import datetime
+from datetime import date, datetime
 import logging
-import json
 import os
+import re
+import threading
+
+from utils.geo_index import get_geo_index
+from utils.schema import COLUMN_ORDER, EXCEL_EPOCH, RowBatch, serial_to_date
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -9,88 +13,224 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 COUNTRIES_METADATA_FILE = os.path.join(BASE_DIR, "data", "Countries Metadata.json")
 
-with open(COUNTRIES_METADATA_FILE, "r", encoding="utf-8") as f:
-    country_metadata = {c["name"]: c for c in json.load(f)}
+# Country -> (region, purchasing power, purchase score) for rows whose country is unknown
+COUNTRY_NOT_FOUND = ("N/A", "N/A", "N/A")
+
+# NumPy (installed with pandas) parses a whole day's timestamps in one call.
+# It is imported with the first batch rather than at startup; None once it is known to be missing.
+_np = None
+_numpy_checked = False
+
+_country_lookup = None
+_country_lock = threading.Lock()
+
+
+def _numpy():
+    global _np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = None
+        _numpy_checked = True
+    return _np
+
+
+def get_country_lookup():
+    """
+    Country name -> (region, purchasing power, purchase score), read on first
+    use from the compiled snapshot the geo resolver shares.
+    """
+    global _country_lookup
+    if _country_lookup is None:
+        lookup = get_geo_index(COUNTRIES_METADATA_FILE).snapshot.country_lookup()
+        with _country_lock:
+            if _country_lookup is None:
+                _country_lookup = lookup
+    return _country_lookup
+
+
+CREATED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# Timestamps strptime would accept with this exact shape; anything else takes the strptime path
+STRICT_CREATED_AT = re.compile(r"(?!0000)\d{4}-\d{2}-\d{2}T(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\dZ", re.ASCII)
+EXCEL_EPOCH_ORDINAL = EXCEL_EPOCH.toordinal()
+
+# Marks a row that fails the way the per-row mapper skipped it
+_SKIP = object()
+
+
+# Per-row fields that can fail on malformed referrer data, in output order
+ROW_FIELD_COLUMNS = [
+    "referrer_name",
+    "referrer_domain",
+    "referrer_utm_source",
+    "referrer_utm_medium",
+    "referrer_utm_campaign",
+    "referrer_utm_content",
+    "Subscriber Region",
+    "Subscriber Purchase Power",
+    "Subscriber Purchase Score"
+]
 
 
 class DataMapper:
     @staticmethod
     def combine_data(subscribers):
         """
-        Combines subscriber and purchase data into a unified format.
+        Combines enriched subscriber data into a unified format.
 
         Args:
             subscribers (list): List of subscriber dictionaries.
-            purchases (list): List of purchase dictionaries.
 
         Returns:
             list: Combined data in a unified format.
         """
-        # Create a map of purchases by email for quick lookup
-        combined_data = []
+        columns = DataMapper.build_rows(subscribers).columns
+        return [dict(zip(COLUMN_ORDER, row)) for row in zip(*(columns[name] for name in COLUMN_ORDER))]
 
-        for subscriber in subscribers:
-            try:
-                # Extract subscriber email and created_at
-                subscriber_email = subscriber.get('email', '')
-                subscriber_created_at = subscriber.get('created_at', '')
-
-                formatted_date = None  # Default fallback value
-                if subscriber_created_at:
-                    try:
-                        parsed_date = datetime.strptime(subscriber_created_at, "%Y-%m-%dT%H:%M:%SZ")
-                        # Calculate days since Excel epoch (1900-01-01)
-                        excel_epoch = datetime(1900, 1, 1)
-                        delta = parsed_date - excel_epoch
-                        # Add 1 day because Excel counts 1900-01-01 as day 1
-                        serial_date = delta.days + 2
-                        formatted_date = serial_date
-                    except ValueError as e:
-                        logging.error(f"Invalid date format for {subscriber_created_at}: {e}")
-                        formatted_date = 0  # Fallback to 0 for spreadsheet compatibility
-
-                # Safely handle referrer_info
-                referrer_info = subscriber.get("referrer_info", {})
-                if referrer_info is None:
-                    referrer_info = {}  # Default to an empty dictionary if None
-                    logging.warning(f"Referrer info is None for subscriber: {subscriber_email}")
-
-                # Safely access nested referrer_info fields
-                referrer_name = referrer_info.get("origin", {}).get("name", "")
-                referrer_domain = referrer_info.get("referrer_domain", "")
-                referrer_utm = referrer_info.get("referrer_utm", {})
-                referrer_utm_source = referrer_utm.get("source", "")
-                referrer_utm_medium = referrer_utm.get("medium", "")
-                referrer_utm_campaign = referrer_utm.get("campaign", "")
-                referrer_utm_content = referrer_utm.get("content", "")
-
-                country = subscriber.get("location_country", "")
-                subscriber_region = country_metadata.get(country, {}).get("region", "N/A")
-                purchasing_power = country_metadata.get(country, {}).get("purchasing_power", "N/A")
-                purchase_score = country_metadata.get(country, {}).get("purchase_score", "N/A")
-
-                # Combine all data into a single record
-                combined_record = {
-                    "subscriber_created_at": formatted_date,
-                    "subscriber_state": subscriber.get("status", ""),
-                    "subscriber_email": subscriber_email,
-                    "referrer_name": referrer_name,
-                    "referrer_domain": referrer_domain,
-                    "referrer_utm_source": referrer_utm_source,
-                    "referrer_utm_medium": referrer_utm_medium,
-                    "referrer_utm_campaign": referrer_utm_campaign,
-                    "referrer_utm_content": referrer_utm_content,
-                    "subscriber_physical_state": subscriber.get("location_state", ""),
-                    "subscriber_country": subscriber.get("location_country", ""),
-                    "Subscriber Region": subscriber_region,
-                    "Subscriber Purchase Power" : purchasing_power,
-                    "Subscriber Purchase Score": purchase_score 
-                }
-
-                combined_data.append(combined_record)
+    @staticmethod
+    def build_rows(subscribers):
+        """
+        Maps a whole batch of subscribers into a columnar RowBatch for the sinks.
+
+        Timestamps are parsed in bulk into both the Excel serial and the
+        YYYY-MM-DD date. Only the referrer and country fields, which can fail on
+        malformed data, are mapped row by row; a subscriber that fails there is
+        logged and skipped.
 
+        Args:
+            subscribers (list): List of enriched subscriber dictionaries.
+
+        Returns:
+            RowBatch: Columns in COLUMN_ORDER plus the created dates.
+        """
+        serials, dates = DataMapper._parse_created_at([subscriber.get('created_at', '') for subscriber in subscribers])
+
+        kept = []
+        created_serials = []
+        created_dates = []
+        row_fields = []
+        for subscriber, serial, created_date in zip(subscribers, serials, dates):
+            try:
+                if isinstance(serial, Exception):
+                    raise serial
+                fields = DataMapper._row_fields(subscriber)
             except Exception as e:
-                logging.error(f"Error processing subscriber {subscriber_email}: {e}")
+                logging.error(f"Error processing subscriber {subscriber.get('email', '')}: {e}")
                 continue  # Skip this subscriber and continue with the next one
 
-        return combined_data
\ No newline at end of file
+            kept.append(subscriber)
+            created_serials.append(serial)
+            created_dates.append(created_date)
+            row_fields.append(fields)
+
+        columns = {
+            "subscriber_created_at": created_serials,
+            "subscriber_state": [subscriber.get("status", "") for subscriber in kept],
+            "subscriber_email": [subscriber.get("email", "") for subscriber in kept],
+            "subscriber_physical_state": [subscriber.get("location_state", "") for subscriber in kept],
+            "subscriber_country": [subscriber.get("location_country", "") for subscriber in kept],
+        }
+        transposed = [list(column) for column in zip(*row_fields)] or [[] for _ in ROW_FIELD_COLUMNS]
+        columns.update(zip(ROW_FIELD_COLUMNS, transposed))
+
+        return RowBatch(columns, created_dates)
+
+    @staticmethod
+    def _row_fields(subscriber):
+        """Referrer and country fields of one subscriber, in ROW_FIELD_COLUMNS order."""
+        # Safely handle referrer_info
+        referrer_info = subscriber.get("referrer_info", {})
+        if referrer_info is None:
+            referrer_info = {}  # Default to an empty dictionary if None
+            logging.warning(f"Referrer info is None for subscriber: {subscriber.get('email', '')}")
+
+        referrer_utm = referrer_info.get("referrer_utm", {})
+        region, purchasing_power, purchase_score = get_country_lookup().get(
+            subscriber.get("location_country", ""), COUNTRY_NOT_FOUND
+        )
+        return (
+            referrer_info.get("origin", {}).get("name", ""),
+            referrer_info.get("referrer_domain", ""),
+            referrer_utm.get("source", ""),
+            referrer_utm.get("medium", ""),
+            referrer_utm.get("campaign", ""),
+            referrer_utm.get("content", ""),
+            region,
+            purchasing_power,
+            purchase_score,
+        )
+
+    @staticmethod
+    def _parse_created_at(values):
+        """
+        Parses created_at timestamps into Excel serials and YYYY-MM-DD dates.
+
+        Well-formed timestamps are converted together; anything else goes
+        through strptime one by one. Empty values map to (None, "N/A"), and
+        unparsable strings to (0, "1899-12-30") as before.
+
+        Returns:
+            tuple: (serials, dates). A serial is an Exception for a value the
+            row mapper must skip.
+        """
+        serials = [None] * len(values)
+        dates = ["N/A"] * len(values)
+        strict = []
+
+        for i, value in enumerate(values):
+            if not value:
+                continue
+            if isinstance(value, str) and STRICT_CREATED_AT.fullmatch(value):
+                strict.append(i)
+                continue
+            try:
+                serials[i], dates[i] = DataMapper._parse_one(value)
+            except Exception as e:
+                serials[i] = e
+
+        days = DataMapper._days_since_epoch([values[i][:10] for i in strict])
+        for i, day in zip(strict, days):
+            if day is None:
+                # Right shape, impossible date (e.g. Feb 30): let strptime report it
+                serials[i], dates[i] = DataMapper._parse_one(values[i])
+            else:
+                # Add 1 day because Excel counts 1900-01-01 as day 1
+                serials[i] = day + 2
+                dates[i] = values[i][:10]
+
+        return serials, dates
+
+    @staticmethod
+    def _days_since_epoch(day_strings):
+        """Days from the Excel epoch for YYYY-MM-DD strings; None where the date does not exist."""
+        np = _numpy() if day_strings else None
+        if np is not None:
+            try:
+                days = np.array(day_strings, dtype="datetime64[D]") - np.datetime64(EXCEL_EPOCH.isoformat(), "D")
+                return days.astype(np.int64).tolist()
+            except ValueError:
+                pass  # At least one impossible date; find it below
+
+        days = []
+        for day_string in day_strings:
+            try:
+                days.append(date.fromisoformat(day_string).toordinal() - EXCEL_EPOCH_ORDINAL)
+            except ValueError:
+                days.append(None)
+        return days
+
+    @staticmethod
+    def _parse_one(value):
+        """strptime path for a single timestamp; returns (serial, date)."""
+        try:
+            parsed_date = datetime.strptime(value, CREATED_AT_FORMAT)
+        except ValueError as e:
+            logging.error(f"Invalid date format for {value}: {e}")
+            return 0, serial_to_date(0)  # Fallback to 0 for spreadsheet compatibility
+
+        # Calculate days since Excel epoch (1900-01-01)
+        delta = parsed_date - datetime(1900, 1, 1)
+        # Add 1 day because Excel counts 1900-01-01 as day 1
+        return delta.days + 2, parsed_date.date().isoformat()
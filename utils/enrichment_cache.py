@@ -0,0 +1,127 @@
+import json
+import os
+import sqlite3
+import time
+
+
+class EnrichmentCache:
+    """
+    On-disk store of per-subscriber enrichment results, keyed by kind and id.
+
+    A subscriber's location and referrer info are fixed at signup, so reruns and
+    overlapping backfills can reuse what an earlier run fetched instead of going
+    back to app.kit.com. Only successful fetches are stored. Entries older than
+    ttl_days are ignored, as are entries past the shorter ttl_days they were put
+    with, and refresh ignores every stored entry while still recording the
+    fresh results.
+    """
+
+    def __init__(self, db_path=None, ttl_days=None, refresh=False, flush_every=500):
+        """
+        Args:
+            db_path (str): SQLite file; None keeps the cache in memory for the run.
+            ttl_days (float): Maximum age of a usable entry; None never expires.
+            refresh (bool): Refetch everything and overwrite the stored entries.
+            flush_every (int): Pending writes committed at a time.
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400 if ttl_days is not None else None
+        self.refresh = refresh
+        self.flush_every = flush_every
+        self.hits = {}
+        self.misses = {}
+        self._pending = {}
+
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path or ":memory:")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment ("
+            "kind TEXT NOT NULL, subscriber_id TEXT NOT NULL, payload TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "expires_at REAL, PRIMARY KEY (kind, subscriber_id))"
+        )
+        # Caches written before per-entry expiry have no expires_at; their entries never expire on their own
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(enrichment)")}
+        if "expires_at" not in columns:
+            self._conn.execute("ALTER TABLE enrichment ADD COLUMN expires_at REAL")
+        self._conn.commit()
+
+    def _usable(self, fetched_at, expires_at):
+        now = time.time()
+        if self.ttl_seconds is not None and now - fetched_at > self.ttl_seconds:
+            return False
+        return expires_at is None or now < expires_at
+
+    def get(self, kind, subscriber_id):
+        """
+        Look up a stored result.
+
+        Returns:
+            The stored payload, or None when there is no usable entry.
+        """
+        payload = None
+        if not self.refresh:
+            key = (kind, str(subscriber_id))
+            if key in self._pending:
+                pending_payload, fetched_at, expires_at = self._pending[key]
+                if self._usable(fetched_at, expires_at):
+                    payload = pending_payload
+            else:
+                row = self._conn.execute(
+                    "SELECT payload, fetched_at, expires_at FROM enrichment WHERE kind = ? AND subscriber_id = ?", key
+                ).fetchone()
+                if row is not None and self._usable(row[1], row[2]):
+                    payload = json.loads(row[0])
+
+        counter = self.misses if payload is None else self.hits
+        counter[kind] = counter.get(kind, 0) + 1
+        return payload
+
+    def put(self, kind, subscriber_id, payload, ttl_days=None):
+        """
+        Record a freshly fetched result; it is written on the next flush.
+
+        Args:
+            ttl_days (float): Expire this entry sooner than the cache's own ttl_days, e.g. for
+                a result that may only reflect a transient problem.
+        """
+        now = time.time()
+        expires_at = now + ttl_days * 86400 if ttl_days is not None else None
+        self._pending[(kind, str(subscriber_id))] = (payload, now, expires_at)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending or self._conn is None:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO enrichment (kind, subscriber_id, payload, fetched_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(kind, subscriber_id, json.dumps(payload), fetched_at, expires_at)
+             for (kind, subscriber_id), (payload, fetched_at, expires_at) in self._pending.items()]
+        )
+        self._conn.commit()
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        """Hits, misses and the fraction of lookups served from the cache, per kind and overall."""
+        stats = {}
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            stats[kind] = {"hits": hits, "misses": misses, "saved": hits / (hits + misses)}
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        stats["total"] = {"hits": hits, "misses": misses, "saved": hits / (hits + misses) if hits + misses else 0.0}
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        parts = [f"{kind} {s['hits']}/{s['hits'] + s['misses']}" for kind, s in stats.items() if kind != "total"]
+        total = stats["total"]
+        return (f"saved {total['hits']} of {total['hits'] + total['misses']} requests "
+                f"({total['saved'] * 100:.1f}%)" + (f": {', '.join(parts)}" if parts else ""))
@@ -0,0 +1,59 @@
+import asyncio
+
+from config.settings import utm_fallback_max_concurrent, base_url as api_base_url
+from utils.helpers import fetch_subscribers_fields
+from utils.rate_limiter import AdaptiveLimiter
+from utils.single_flight import SingleFlight
+
+
+class FieldsLookup:
+    """
+    Custom fields (the UTM fields among them) of a subscriber.
+
+    The /v4/subscribers list pages already carry each subscriber's fields, so
+    those are used as they are and only a subscriber listed without them costs
+    a /v4/subscribers/{id} request. Kit v4 has no lookup of several subscribers
+    by id, so that request stays per subscriber, shared through the run's
+    SingleFlight. Swap this class out to fake the lookups in benchmarks.
+    """
+
+    def __init__(self, api_base_url=api_base_url, limiter=None, max_concurrent=utm_fallback_max_concurrent,
+                 single_flight=None):
+        """
+        Args:
+            api_base_url (str): Kit v4 API root.
+            limiter (AdaptiveLimiter): Request budget for api.kit.com.
+            max_concurrent (int): Separate budget for the per-subscriber requests.
+            single_flight (SingleFlight): Shares one request between lookups of the same subscriber.
+        """
+        self.api_base_url = api_base_url
+        self.limiter = limiter or AdaptiveLimiter.from_settings("api.kit.com")
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.single_flight = single_flight or SingleFlight()
+        self.from_list = 0
+        self.by_id = 0
+
+    async def fields(self, session, subscriber_id, listed_fields=None):
+        """
+        Args:
+            session (aiohttp.ClientSession): Shared run session.
+            subscriber_id (int): Subscriber to look up.
+            listed_fields (dict): The subscriber's fields from the list page, if it had them.
+
+        Returns:
+            dict: The subscriber's custom fields.
+        """
+        if listed_fields is not None:
+            self.from_list += 1
+            return listed_fields
+
+        self.by_id += 1
+        payload = await self.single_flight.do(
+            "fields", subscriber_id,
+            lambda: fetch_subscribers_fields(session, subscriber_id, self.semaphore, self.limiter,
+                                             api_base_url=self.api_base_url),
+            keep=lambda result: isinstance(result, dict) and "subscriber" in result)
+        return payload["subscriber"]["fields"]
+
+    def summary(self):
+        return f"{self.from_list} from list pages, {self.by_id} looked up by id"
@@ -0,0 +1,86 @@
+import threading
+
+from utils.geo_snapshot import load_snapshot
+
+
+def normalize(name):
+    """Normalize a place name the same way the scanners always have."""
+    return name.lower().strip() if name else None
+
+
+class GeoIndex:
+    """
+    Country lookups over the compiled Countries Metadata snapshot, one per process.
+
+    Every lookup returns the first country (in file order) that matches a key,
+    which is exactly what the original nested scans returned.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.metadata_hash = snapshot.metadata_hash
+
+    @classmethod
+    def from_json(cls, json_path):
+        """Load the snapshot of json_path, rebuilding it if the JSON changed since it was compiled."""
+        return cls(load_snapshot(json_path))
+
+    def search(self, city, state):
+        """
+        Resolve a normalized city/state pair to a country.
+
+        Mirrors the four phases of the original scanner: capital match,
+        exact city+state match, city candidates narrowed by state, and a
+        state-only fallback.
+        """
+        if not city and not state:
+            return "N/A"
+
+        snapshot = self.snapshot
+
+        # Phase 1: Capital city match is definitive
+        capital_country = snapshot.capital(city) if city else None
+        if capital_country is not None:
+            return capital_country
+
+        # Phase 2: Exact match on both city and state
+        exact_match_country = snapshot.city_state(city, state) if city and state else None
+        if exact_match_country:
+            return exact_match_country
+
+        # Phase 3: Narrow down city candidates using state
+        candidate_countries = snapshot.city_countries(city) if city else set()
+        if state and len(candidate_countries) > 1:
+            narrowed_candidates = candidate_countries & snapshot.state_countries(state)
+            if len(narrowed_candidates) == 1:
+                return next(iter(narrowed_candidates))
+
+        # Phase 4: Fallback to state-based lookup
+        state_country = snapshot.state(state) if state else None
+        if state_country is not None:
+            return state_country
+
+        return "N/A"
+
+    def handle(self, city):
+        """Global city lookup (capitals included) used by the Handler fallback."""
+        country = self.snapshot.any_city(city) if city else None
+        return country if country is not None else "N/A"
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_geo_index(json_path):
+    """
+    Return the process-wide GeoIndex for json_path, building it on first use.
+    """
+    index = _indexes.get(json_path)
+    if index is None:
+        with _lock:
+            index = _indexes.get(json_path)
+            if index is None:
+                index = GeoIndex.from_json(json_path)
+                _indexes[json_path] = index
+    return index
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+# Layout: header, section table, then 8-byte aligned sections of native-endian arrays
+MAGIC = b"UTMGEO\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQq32sI")  # magic, version, little-endian flag, json size, json mtime_ns, sha256, sections
+SECTION = struct.Struct("<QQ")         # offset, length in bytes
+ALIGN = 8
+
+# Section order in the file, with the array typecode of each section
+SECTIONS = (
+    ("string_offsets", "I"),         # string i is blob[offsets[i]:offsets[i + 1]], strings sorted by UTF-8 bytes
+    ("string_blob", "B"),
+    ("countries", "I"),              # per country: name, region, purchasing power, purchase score (string ids)
+    ("capital_keys", "I"), ("capital_values", "I"),
+    ("state_keys", "I"), ("state_values", "I"),
+    ("any_city_keys", "I"), ("any_city_values", "I"),
+    ("city_state_keys", "Q"), ("city_state_values", "I"),  # key is city_id << 32 | state_id
+    ("city_countries_keys", "I"), ("city_countries_offsets", "I"), ("city_countries_values", "I"),
+    ("state_countries_keys", "I"), ("state_countries_offsets", "I"), ("state_countries_values", "I"),
+)
+
+
+def snapshot_path_for(json_path):
+    """Where the snapshot of json_path lives: next to it, with a .geosnap extension."""
+    return os.path.splitext(json_path)[0] + ".geosnap"
+
+
+def _read_json(json_path):
+    try:
+        with open(json_path, "rb") as f:
+            raw = f.read()
+            stat = os.fstat(f.fileno())
+    except FileNotFoundError:
+        raise RuntimeError(f"JSON file not found at: {json_path}")
+    return raw, stat
+
+
+def build_snapshot(raw, json_size=0, json_mtime_ns=0):
+    """
+    Compile Countries Metadata JSON into snapshot bytes.
+
+    Every map keeps the first country (in file order) that matches a key, as the
+    original nested scans did. Country fields come from the last entry with a
+    given name, as the name-keyed metadata dict always had them.
+
+    Args:
+        raw (bytes): The JSON file contents.
+        json_size (int): Size of the JSON file, recorded to detect changes.
+        json_mtime_ns (int): Modification time of the JSON file, recorded to detect changes.
+
+    Returns:
+        bytes: The snapshot.
+    """
+    try:
+        countries = json.loads(raw.decode("utf-8"))
+    except Exception as e:
+        raise RuntimeError(f"Failed to load JSON data: {str(e)}")
+
+    country_ids = {}
+    country_fields = {}
+    capitals, states, any_city, city_states = {}, {}, {}, {}
+    city_countries, state_countries = {}, {}
+
+    for country in countries:
+        country_name = country["name"]
+        country_id = country_ids.setdefault(country_name, len(country_ids))
+        country_fields[country_name] = tuple(
+            json.dumps(country.get(field, "N/A")) for field in ("region", "purchasing_power", "purchase_score")
+        )
+        capital = (country.get("capital") or "").lower().strip()
+        capitals.setdefault(capital, country_id)
+        any_city.setdefault(capital, country_id)
+
+        for state in country.get("states", []):
+            state_name = state["name"].lower().strip()
+            states.setdefault(state_name, country_id)
+            state_countries.setdefault(state_name, set()).add(country_id)
+
+            for city in state.get("cities", []):
+                city_name = city["name"].lower().strip()
+                city_states.setdefault((city_name, state_name), country_id)
+                city_countries.setdefault(city_name, set()).add(country_id)
+                any_city.setdefault(city_name, country_id)
+
+    # Intern every string once; ids follow byte order so key arrays sorted by id are sorted by text
+    strings = set(country_ids) | set(capitals) | set(states) | set(any_city)
+    for fields in country_fields.values():
+        strings.update(fields)
+    encoded = sorted(text.encode("utf-8") for text in strings)
+    string_ids = {text.decode("utf-8"): i for i, text in enumerate(encoded)}
+    string_offsets = array("I", [0])
+    for text in encoded:
+        string_offsets.append(string_offsets[-1] + len(text))
+
+    sections = {
+        "string_offsets": string_offsets,
+        "string_blob": b"".join(encoded),
+        "countries": array("I", [string_ids[value]
+                                 for name in country_ids
+                                 for value in (name, *country_fields[name])]),
+    }
+
+    def single(prefix, mapping):
+        keys = sorted((string_ids[key], value) for key, value in mapping.items())
+        sections[f"{prefix}_keys"] = array("I", [key for key, _ in keys])
+        sections[f"{prefix}_values"] = array("I", [value for _, value in keys])
+
+    def multi(prefix, mapping):
+        keys = sorted((string_ids[key], sorted(values)) for key, values in mapping.items())
+        offsets, values = array("I", [0]), array("I")
+        for _, ids in keys:
+            values.extend(ids)
+            offsets.append(len(values))
+        sections[f"{prefix}_keys"] = array("I", [key for key, _ in keys])
+        sections[f"{prefix}_offsets"] = offsets
+        sections[f"{prefix}_values"] = values
+
+    single("capital", capitals)
+    single("state", states)
+    single("any_city", any_city)
+    multi("city_countries", city_countries)
+    multi("state_countries", state_countries)
+    pairs = sorted((string_ids[city] << 32 | string_ids[state], value) for (city, state), value in city_states.items())
+    sections["city_state_keys"] = array("Q", [key for key, _ in pairs])
+    sections["city_state_values"] = array("I", [value for _, value in pairs])
+
+    header_size = HEADER.size + SECTION.size * len(SECTIONS)
+    offset = header_size + -header_size % ALIGN
+    table, body = [], []
+    for name, _ in SECTIONS:
+        data = bytes(sections[name])
+        table.append(SECTION.pack(offset, len(data)))
+        padding = -len(data) % ALIGN
+        body.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    header = HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", json_size, json_mtime_ns,
+                         hashlib.sha256(raw).digest(), len(SECTIONS))
+    header += b"".join(table)
+    return header + b"\0" * (-len(header) % ALIGN) + b"".join(body)
+
+
+def write_snapshot(json_path, snapshot_path=None):
+    """
+    Build the snapshot of json_path and write it atomically.
+
+    Returns:
+        bytes: The snapshot that was written.
+    """
+    snapshot_path = snapshot_path or snapshot_path_for(json_path)
+    raw, stat = _read_json(json_path)
+    data = build_snapshot(raw, stat.st_size, stat.st_mtime_ns)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, snapshot_path)
+    return data
+
+
+class GeoSnapshot:
+    """
+    Read-only view of a compiled Countries Metadata snapshot.
+
+    The file is memory-mapped and its sections are used in place as arrays:
+    strings are looked up by binary search over the sorted string table, and
+    each index is a sorted array of string ids searched with bisect. Nothing is
+    unpacked into Python objects beyond what a lookup returns.
+    """
+
+    def __init__(self, data):
+        """
+        Args:
+            data (bytes | mmap.mmap): Snapshot contents.
+        """
+        magic, version, little_endian, self.json_size, self.json_mtime_ns, digest, count = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or count != len(SECTIONS):
+            raise ValueError("Not a Countries Metadata snapshot of this version")
+        if bool(little_endian) != (sys.byteorder == "little"):
+            raise ValueError("Snapshot was built on a machine with a different byte order")
+        self.metadata_hash = digest.hex()
+        self._data = data
+
+        view = memoryview(data)
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(data, HEADER.size + i * SECTION.size)
+            if name == "string_blob":
+                self._blob_start = offset
+            else:
+                setattr(self, f"_{name}", view[offset:offset + length].cast(typecode))
+        self._string_count = len(self._string_offsets) - 1
+        self._country_names = {}
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def is_current(self, json_path):
+        """Whether the snapshot was built from json_path as it is on disk now."""
+        stat = os.stat(json_path)
+        return stat.st_size == self.json_size and stat.st_mtime_ns == self.json_mtime_ns
+
+    def string(self, string_id):
+        start = self._blob_start
+        return self._data[start + self._string_offsets[string_id]:start + self._string_offsets[string_id + 1]].decode("utf-8")
+
+    def string_id(self, text):
+        """Id of text in the string table, or None when the snapshot has no such string."""
+        key = text.encode("utf-8")
+        data, offsets, start = self._data, self._string_offsets, self._blob_start
+        low, high = 0, self._string_count
+        while low < high:
+            middle = (low + high) // 2
+            if data[start + offsets[middle]:start + offsets[middle + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._string_count and data[start + offsets[low]:start + offsets[low + 1]] == key:
+            return low
+        return None
+
+    def country_name(self, country_id):
+        name = self._country_names.get(country_id)
+        if name is None:
+            name = self._country_names[country_id] = self.string(self._countries[country_id * 4])
+        return name
+
+    def country_lookup(self):
+        """Country name -> (region, purchasing power, purchase score), with the JSON values' types."""
+        countries = self._countries
+        return {
+            self.string(countries[i]): tuple(json.loads(self.string(countries[i + field])) for field in (1, 2, 3))
+            for i in range(0, len(countries), 4)
+        }
+
+    def _single(self, keys, values, key_id):
+        if key_id is None:
+            return None
+        i = bisect_left(keys, key_id)
+        if i < len(keys) and keys[i] == key_id:
+            return self.country_name(values[i])
+        return None
+
+    def _multi(self, keys, offsets, values, key_id):
+        if key_id is None:
+            return set()
+        i = bisect_left(keys, key_id)
+        if i < len(keys) and keys[i] == key_id:
+            return {self.country_name(values[j]) for j in range(offsets[i], offsets[i + 1])}
+        return set()
+
+    def capital(self, city):
+        return self._single(self._capital_keys, self._capital_values, self.string_id(city))
+
+    def state(self, state):
+        return self._single(self._state_keys, self._state_values, self.string_id(state))
+
+    def any_city(self, city):
+        return self._single(self._any_city_keys, self._any_city_values, self.string_id(city))
+
+    def city_state(self, city, state):
+        city_id, state_id = self.string_id(city), self.string_id(state)
+        if city_id is None or state_id is None:
+            return None
+        return self._single(self._city_state_keys, self._city_state_values, city_id << 32 | state_id)
+
+    def city_countries(self, city):
+        return self._multi(self._city_countries_keys, self._city_countries_offsets, self._city_countries_values,
+                           self.string_id(city))
+
+    def state_countries(self, state):
+        return self._multi(self._state_countries_keys, self._state_countries_offsets, self._state_countries_values,
+                           self.string_id(state))
+
+
+def load_snapshot(json_path, snapshot_path=None):
+    """
+    Open the snapshot of json_path, rebuilding it first if it is missing, from
+    another version, or older than the JSON.
+
+    When the snapshot cannot be written (e.g. a read-only data directory) it is
+    built in memory for this process instead.
+    """
+    snapshot_path = snapshot_path or snapshot_path_for(json_path)
+    if not os.path.exists(json_path):
+        raise RuntimeError(f"JSON file not found at: {json_path}")
+    try:
+        snapshot = GeoSnapshot.open(snapshot_path)
+        if snapshot.is_current(json_path):
+            return snapshot
+    except (OSError, ValueError, struct.error):
+        pass  # Missing or unreadable: rebuild below
+
+    try:
+        write_snapshot(json_path, snapshot_path)
+        return GeoSnapshot.open(snapshot_path)
+    except OSError:
+        raw, stat = _read_json(json_path)
+        return GeoSnapshot(build_snapshot(raw, stat.st_size, stat.st_mtime_ns))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile Countries Metadata.json into a memory-mappable snapshot.")
+    parser.add_argument("--json_path", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                            "data", "Countries Metadata.json"))
+    parser.add_argument("--snapshot_path", default=None, help="Defaults to the JSON path with a .geosnap extension")
+    args = parser.parse_args()
+    data = write_snapshot(args.json_path, args.snapshot_path)
+    print(f"Wrote {len(data)} bytes to {args.snapshot_path or snapshot_path_for(args.json_path)}")
@@ -1,51 +1,57 @@
 import asyncio, aiohttp
 import os
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from config.settings import base_url
-import requests
-import re
-from config.settings import facebook_ads_campaigns
+from utils.utm_normalizer import normalizer
 
 load_dotenv()
 
+def _fields_headers():
+    return {
+            'Accept': 'application/json',
+            'X-Kit-Api-Key': os.getenv("KIT_V4_API_KEY")
+    }
+
 def get_subscribers_fields(subscriber_id):
     """
     ARGS: subscriber_id
     Returns All tags for a subscriber. Pretty simple, huh?
+    Blocking; kept for the __main__ debugging path. The pipeline uses fetch_subscribers_fields.
     """
-    url = base_url + f"/subscribers/{subscriber_id}"
-    headers = {
-            'Accept': 'application/json',
-            'X-Kit-Api-Key': os.getenv("KIT_V4_API_KEY")
-    }
+    import requests
 
-    response = requests.get(url = url, headers = headers)
+    url = base_url + f"/subscribers/{subscriber_id}"
+    response = requests.get(url = url, headers = _fields_headers())
     return  response.json()
+
+async def fetch_subscribers_fields(session, subscriber_id, semaphore=None, limiter=None, api_base_url=base_url):
+    """
+    ARGS: session (shared aiohttp.ClientSession), subscriber_id, semaphore (optional concurrency limit),
+          limiter (optional AdaptiveLimiter for api.kit.com), api_base_url (Kit v4 API root)
+    Async version of get_subscribers_fields that does not block the event loop.
+
+    Returns: The same JSON payload as get_subscribers_fields.
+    """
+    url = api_base_url + f"/subscribers/{subscriber_id}"
+    async with semaphore or nullcontext():
+        if limiter is None:
+            request = session.get(url, headers=_fields_headers())
+        else:
+            request = limiter.request(session, "GET", url, headers=_fields_headers())
+        async with request as response:
+            return await response.json(content_type=None)
     
 def extract_utms(subscriber_data):
     """
     ARGS: A JSON of subscribers data. Usually: {subscriber: {id: ''...., fields: {}}}
     The goal is to extract the utm values from those fields. 
+    Thin wrapper over utils.utm_normalizer, which holds the rules.
     
     Returns: UTM_source, UTM_Medium, UTM_Campaign, UTM_Content  
     """
-    pattern = r'\b\d{11,}\b'
-    
-    source = subscriber_data["subscriber"]["fields"].get("utm_source") or ""
-    medium = subscriber_data["subscriber"]["fields"].get("utm_medium") or ""
-    campaign = subscriber_data["subscriber"]["fields"].get("utm_campaign") or ""
-    content = subscriber_data["subscriber"]["fields"].get("utm_content") or ""
-
-    if re.search(pattern, source) or source == "fb":
-        source = "facebook-ads"
-    
-    if re.search(pattern, campaign):
-        campaign = "facebook-ads"
-    
-    elif medium in facebook_ads_campaigns:
-        medium = 'paid-ads'
-    
-    return source, medium, campaign, content
+    utms = normalizer.normalize_fields(subscriber_data["subscriber"]["fields"])
+    return utms["source"], utms["medium"], utms["campaign"], utms["content"]
     
 def unify_sources():
     pass
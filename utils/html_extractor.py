@@ -0,0 +1,107 @@
+import codecs
+import time
+from html.parser import HTMLParser
+
+from utils.metrics import run_metrics
+
+
+class LocationAttributeParser(HTMLParser):
+    """Records the first tag carrying both data-city and data-state, then ignores the rest."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.location = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.location is not None:
+            return
+        values = dict(attrs)
+        if "data-city" in values and "data-state" in values:
+            # Valueless attributes come through as None; BeautifulSoup reports them as ""
+            self.location = (values["data-city"] or "", values["data-state"] or "")
+
+
+class LocationExtractor:
+    """
+    Incremental extractor for the subscriber page's location element.
+
+    Feed it raw body chunks as they arrive; it stops parsing as soon as the
+    element is found. If the parser chokes, the decoded page is kept so the
+    caller can fall back to BeautifulSoup; a page it read to the end without
+    finding the element has none, as BeautifulSoup would tokenize it the same way.
+    """
+
+    def __init__(self, encoding=None):
+        try:
+            decoder_factory = codecs.getincrementaldecoder(encoding or "utf-8")
+        except LookupError:
+            decoder_factory = codecs.getincrementaldecoder("utf-8")
+        self._decoder = decoder_factory(errors="replace")
+        self._parser = LocationAttributeParser()
+        self._parts = []
+        self._parser_failed = False
+
+    @property
+    def location(self):
+        return self._parser.location
+
+    @property
+    def failed(self):
+        return self._parser_failed
+
+    @property
+    def html(self):
+        return "".join(self._parts)
+
+    def _parse(self, text):
+        self._parts.append(text)
+        if self._parser_failed:
+            return
+        try:
+            self._parser.feed(text)
+        except Exception:
+            self._parser_failed = True
+
+    def feed(self, chunk):
+        """Feed a chunk of the body; returns True once the location has been found."""
+        self._parse(self._decoder.decode(chunk))
+        return self.location is not None
+
+    def finish(self):
+        """Flush the decoder at end of body and return the location, or None."""
+        self._parse(self._decoder.decode(b"", final=True))
+        if not self._parser_failed:
+            try:
+                self._parser.close()
+            except Exception:
+                self._parser_failed = True
+        return self.location
+
+
+async def extract_location_from_response(response, chunk_size=65536):
+    """
+    Stream an aiohttp response through a LocationExtractor.
+
+    The remainder of the body is drained unparsed after an early hit so the
+    connection can go back to the pool.
+
+    Returns:
+        tuple: ((city, state) or None, html) where html is only set when the parser failed.
+    """
+    extractor = LocationExtractor(response.charset)
+    found = False
+    # Parse time only; waiting for the body is part of the scrape
+    parse_seconds = 0.0
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if found:
+            continue
+        start = time.perf_counter()
+        found = extractor.feed(chunk)
+        parse_seconds += time.perf_counter() - start
+    if found:
+        run_metrics.record("html_parse", parse_seconds)
+        return extractor.location, None
+    start = time.perf_counter()
+    location = extractor.finish()
+    run_metrics.record("html_parse", parse_seconds + time.perf_counter() - start)
+    return location, extractor.html if location is None and extractor.failed else None
@@ -0,0 +1,84 @@
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from config.settings import (
+    http_limit,
+    http_limit_per_host,
+    http_keepalive_timeout,
+    http_dns_cache_ttl,
+    http_timeout,
+)
+
+
+class ConnectionStats:
+    """Counts requests against the TCP connections that actually served them."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    async def on_request_start(self, session, trace_config_ctx, params):
+        self.requests += 1
+
+    async def on_connection_create_end(self, session, trace_config_ctx, params):
+        self.connections_created += 1
+
+    async def on_connection_reuseconn(self, session, trace_config_ctx, params):
+        self.connections_reused += 1
+
+    async def on_dns_cache_hit(self, session, trace_config_ctx, params):
+        self.dns_cache_hits += 1
+
+    async def on_dns_cache_miss(self, session, trace_config_ctx, params):
+        self.dns_cache_misses += 1
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self.on_request_start)
+        trace_config.on_connection_create_end.append(self.on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self.on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(self.on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self.on_dns_cache_miss)
+        return trace_config
+
+    def summary(self):
+        return (f"{self.requests} requests over {self.connections_created} new connections "
+                f"({self.connections_reused} reused, {self.dns_cache_misses} DNS lookups)")
+
+
+def build_session(trace_configs=None):
+    """
+    Build the pooled session shared by all fetchers for the life of a run.
+
+    Args:
+        trace_configs (list): Optional aiohttp TraceConfig hooks.
+
+    Returns:
+        aiohttp.ClientSession: Session on a keep-alive TCPConnector with DNS caching.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=http_limit,
+        limit_per_host=http_limit_per_host,
+        keepalive_timeout=http_keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=http_dns_cache_ttl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=http_timeout),
+        trace_configs=trace_configs,
+    )
+
+
+@asynccontextmanager
+async def session_scope(session=None):
+    """Yield the shared session if one is given, otherwise a temporary one closed on exit."""
+    if session is not None:
+        yield session
+        return
+    async with aiohttp.ClientSession() as own_session:
+        yield own_session
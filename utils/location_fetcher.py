@@ -1,21 +1,42 @@
 import aiohttp
-from bs4 import BeautifulSoup
-from rich.console import Console
 import asyncio
 import os
 import sys
 
 
 from config.headers import headers
+from config.settings import app_base_url, enrichment_cache_negative_ttl_days
 from utils.location_identifier import LocationIdentifier
+from utils.http_session import session_scope
+from utils.rate_limiter import AdaptiveLimiter
+from utils.single_flight import SingleFlight
+from utils.html_extractor import extract_location_from_response
+from utils.metrics import run_metrics
+from utils.reporter import reporter
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 class LocationFetcher:
-    def __init__(self):
-        """Initialize the async location fetcher with shared session and console"""
-        self.console = Console()
+    def __init__(self, resolution_cache=None, limiter=None, enrichment_cache=None, base_url=app_base_url,
+                 single_flight=None, negative_ttl_days=enrichment_cache_negative_ttl_days):
+        """
+        Initialize the async location fetcher
+
+        Args:
+            resolution_cache (ResolutionCache): Optional memo of city/state -> country lookups
+            limiter (AdaptiveLimiter): Request budget for app.kit.com
+            enrichment_cache (EnrichmentCache): Optional store of previously scraped city/state per subscriber
+            base_url (str): Root of the subscriber pages (default is https://app.kit.com/subscribers)
+            single_flight (SingleFlight): Shares one page scrape between requests for the same subscriber
+            negative_ttl_days (float): How long a page without a location element stays cached
+        """
         self.headers = headers
+        self.resolution_cache = resolution_cache
+        self.limiter = limiter or AdaptiveLimiter.from_settings("app.kit.com")
+        self.enrichment_cache = enrichment_cache
+        self.base_url = base_url
+        self.single_flight = single_flight or SingleFlight()
+        self.negative_ttl_days = negative_ttl_days
     
     async def fetch_location(self, session, subscriber_id):
         """
@@ -28,58 +49,115 @@ class LocationFetcher:
         Returns:
             tuple: (subscriber_id, city, state, country)
         """
-        url = f"https://app.kit.com/subscribers/{subscriber_id}"
+        if self.enrichment_cache is not None:
+            cached = self.enrichment_cache.get("location", subscriber_id)
+            if cached is not None:
+                city, state = cached["city"], cached["state"]
+                return subscriber_id, city, state, self.identify_country(subscriber_id, city, state)
+
+        scraped = await self.single_flight.do("location", subscriber_id,
+                                              lambda: self.scrape_location(session, subscriber_id),
+                                              keep=lambda result: result is not None)
+        if scraped is None:
+            return subscriber_id, None, None, "N/A"
+        city, state = scraped
+        return subscriber_id, city, state, self.identify_country(subscriber_id, city, state)
+
+    async def scrape_location(self, session, subscriber_id):
+        """
+        Scrape city and state from the subscriber page and record them in the enrichment cache
+
+        Returns:
+            tuple: (city, state), or None if the page could not be fetched
+        """
+        url = f"{self.base_url}/{subscriber_id}"
         try:
-            self.console.print(f"[yellow]Fetching location for subscriber {subscriber_id}...")
-            async with session.get(url, headers=self.headers) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    city, state = self.clean_response(html)
-                    country = "N/A"
-                    if city and state:
-                        try:
-                            identifier = LocationIdentifier(city=city, state=state)
-                            country = identifier.search_with_handler()
-                            self.console.print(f"[green]Found country for {subscriber_id}: {country}")
-                        except Exception as e:
-                            self.console.print(f"[red]Error identifying country for {subscriber_id}: {e}")
-                    return subscriber_id, city, state, country
-                else:
-                    self.console.print(f"[red]Failed to fetch location for {subscriber_id}: {response.status}")
-                    return subscriber_id, None, None, "N/A"
+            reporter.debug(f"Fetching location for subscriber {subscriber_id}...")
+            with run_metrics.stage("location_scrape"):
+                async with self.limiter.request(session, "GET", url, headers=self.headers) as response:
+                    if response.status != 200:
+                        reporter.debug(f"Failed to fetch location for {subscriber_id}: {response.status}")
+                        reporter.count("location fetches failed", failure=True)
+                        return None
+                    city, state = await self.extract_location(response)
         except Exception as e:
-            self.console.print(f"[red]Error fetching location for {subscriber_id}: {e}")
-            return subscriber_id, None, None, "N/A"
+            reporter.debug(f"Error fetching location for {subscriber_id}: {e}")
+            reporter.count("location fetches failed", failure=True)
+            return None
+
+        # No location element at all: the subscriber may have none, or the page may be the login page
+        # of an expired session, so the result is only trusted for a short while
+        found = city is not None or state is not None
+        if not found:
+            reporter.count("location pages without a location element")
+        if self.enrichment_cache is not None:
+            self.enrichment_cache.put("location", subscriber_id, {"city": city, "state": state},
+                                      ttl_days=None if found else self.negative_ttl_days)
+        return city, state
+
+    def identify_country(self, subscriber_id, city, state):
+        """Resolve the country for a scraped city/state; "N/A" when either is missing or unknown"""
+        country = "N/A"
+        if city and state:
+            try:
+                with run_metrics.stage("geo_resolution"):
+                    identifier = LocationIdentifier(city=city, state=state, cache=self.resolution_cache)
+                    country = identifier.search_with_handler()
+                reporter.debug(f"Found country for {subscriber_id}: {country}")
+            except Exception as e:
+                reporter.debug(f"Error identifying country for {subscriber_id}: {e}")
+                reporter.count("country lookups failed", failure=True)
+        return country
+
+    async def extract_location(self, response):
+        """
+        Extract city and state while streaming the page, stopping at the location element.
+        Falls back to a full BeautifulSoup parse only when the streaming parser failed on the page.
+
+        Returns:
+            tuple: (city, state), or (None, None) when the page has no location element.
+        """
+        location, html = await extract_location_from_response(response)
+        if location is not None:
+            return location
+        if html is None:
+            return None, None
+        return self.clean_response(html)
 
     def clean_response(self, html):
         """Extract city and state from HTML response"""
-        soup = BeautifulSoup(html, 'html.parser')
-        locations = soup.find(attrs={"data-city": True, "data-state": True})
+        # Only pages the streaming extractor cannot read get here, so bs4 is imported on first need
+        from bs4 import BeautifulSoup
+
+        with run_metrics.stage("html_parse_fallback"):
+            soup = BeautifulSoup(html, 'html.parser')
+            locations = soup.find(attrs={"data-city": True, "data-state": True})
         if locations:
             city = locations['data-city']
             state = locations['data-state']
             return city, state
         return None, None
     
-    async def fetch_all_locations(self, subscriber_ids, max_concurrent=3):
+    async def fetch_all_locations(self, subscriber_ids, max_concurrent=None, session=None):
         """
         Fetch location data for multiple subscribers concurrently
         
         Args:
             subscriber_ids (list): List of subscriber IDs
-            max_concurrent (int): Maximum number of concurrent requests
+            max_concurrent (int): Maximum number of subscribers in flight (defaults to the limiter's maximum)
+            session (aiohttp.ClientSession): Shared run session; a temporary one is used if omitted
             
         Returns:
             dict: Mapping of subscriber_id to location data
         """
         results = {}
-        semaphore = asyncio.Semaphore(max_concurrent)
+        semaphore = asyncio.Semaphore(max_concurrent or self.limiter.maximum)
         
         async def fetch_with_semaphore(subscriber_id):
             async with semaphore:
                 return await self.fetch_location(session, subscriber_id)
         
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(session) as session:
             tasks = [fetch_with_semaphore(sid) for sid in subscriber_ids]
             for completed_task in asyncio.as_completed(tasks):
                 sid, city, state, country = await completed_task
@@ -0,0 +1,171 @@
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import aiohttp
+
+# Upper bounds (seconds) of the Prometheus request latency histogram
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _write_text_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class RunMetrics:
+    """
+    Per-stage timers and per-host HTTP metrics for one pipeline run.
+
+    Stages are timed as wall time around each unit of work, so stages that run
+    concurrently (e.g. location scrapes on many workers) add up to more than the
+    run's elapsed time; compare stages by their share, not against the clock.
+    HTTP requests are observed through an aiohttp TraceConfig on the run session.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.hosts = {}
+
+    def record(self, stage, seconds):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        """Time the enclosed block (including any awaits in it) as one call of `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def _host(self, host):
+        entry = self.hosts.get(host)
+        if entry is None:
+            entry = self.hosts[host] = {"latencies": [], "statuses": Counter(), "exceptions": Counter()}
+        return entry
+
+    async def on_request_start(self, session, trace_config_ctx, params):
+        trace_config_ctx.started = time.perf_counter()
+
+    async def on_request_end(self, session, trace_config_ctx, params):
+        entry = self._host(params.url.host)
+        entry["latencies"].append(time.perf_counter() - trace_config_ctx.started)
+        entry["statuses"][params.response.status] += 1
+
+    async def on_request_exception(self, session, trace_config_ctx, params):
+        entry = self._host(params.url.host)
+        entry["latencies"].append(time.perf_counter() - trace_config_ctx.started)
+        entry["exceptions"][type(params.exception).__name__] += 1
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self.on_request_start)
+        trace_config.on_request_end.append(self.on_request_end)
+        trace_config.on_request_exception.append(self.on_request_exception)
+        return trace_config
+
+    def report(self, **run_info):
+        """
+        The run report as a JSON-serializable dict.
+
+        Args:
+            **run_info: Run-level values (elapsed time, subscribers processed, ...) stored under "run".
+        """
+        stages = {
+            name: {
+                "count": entry["count"],
+                "seconds": round(entry["seconds"], 6),
+                "mean_ms": round(entry["seconds"] / entry["count"] * 1000, 3),
+                "max_ms": round(entry["max_seconds"] * 1000, 3),
+            }
+            for name, entry in sorted(self.stages.items())
+        }
+        hosts = {}
+        for host, entry in sorted(self.hosts.items()):
+            latencies = sorted(entry["latencies"])
+            hosts[host] = {
+                "requests": len(latencies),
+                "statuses": {str(status): count for status, count in sorted(entry["statuses"].items())},
+                "exceptions": dict(entry["exceptions"]),
+                "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+                "p90_ms": round(_percentile(latencies, 0.90) * 1000, 3),
+                "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+                "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            }
+        return {"run": run_info, "stages": stages, "hosts": hosts}
+
+    def write_json(self, path, **run_info):
+        _write_text_atomic(path, json.dumps(self.report(**run_info), indent=2))
+
+    def write_prometheus(self, path, **run_info):
+        """Write the metrics in Prometheus text format, e.g. for the node_exporter textfile collector."""
+        lines = [
+            "# HELP utm_pipeline_stage_seconds_total Wall time spent in each pipeline stage.",
+            "# TYPE utm_pipeline_stage_seconds_total counter",
+        ]
+        lines += [f'utm_pipeline_stage_seconds_total{{stage="{name}"}} {entry["seconds"]:.6f}'
+                  for name, entry in sorted(self.stages.items())]
+        lines += [
+            "# HELP utm_pipeline_stage_calls_total Units of work timed per pipeline stage.",
+            "# TYPE utm_pipeline_stage_calls_total counter",
+        ]
+        lines += [f'utm_pipeline_stage_calls_total{{stage="{name}"}} {entry["count"]}'
+                  for name, entry in sorted(self.stages.items())]
+
+        lines += [
+            "# HELP utm_pipeline_http_requests_total HTTP requests by host and status.",
+            "# TYPE utm_pipeline_http_requests_total counter",
+        ]
+        for host, entry in sorted(self.hosts.items()):
+            lines += [f'utm_pipeline_http_requests_total{{host="{host}",status="{status}"}} {count}'
+                      for status, count in sorted(entry["statuses"].items())]
+            lines += [f'utm_pipeline_http_requests_total{{host="{host}",status="{name}"}} {count}'
+                      for name, count in sorted(entry["exceptions"].items())]
+
+        lines += [
+            "# HELP utm_pipeline_http_request_duration_seconds HTTP request latency by host.",
+            "# TYPE utm_pipeline_http_request_duration_seconds histogram",
+        ]
+        for host, entry in sorted(self.hosts.items()):
+            latencies = entry["latencies"]
+            for bound in LATENCY_BUCKETS:
+                count = sum(1 for latency in latencies if latency <= bound)
+                lines.append(f'utm_pipeline_http_request_duration_seconds_bucket{{host="{host}",le="{bound}"}} {count}')
+            lines.append(f'utm_pipeline_http_request_duration_seconds_bucket{{host="{host}",le="+Inf"}} {len(latencies)}')
+            lines.append(f'utm_pipeline_http_request_duration_seconds_sum{{host="{host}"}} {sum(latencies):.6f}')
+            lines.append(f'utm_pipeline_http_request_duration_seconds_count{{host="{host}"}} {len(latencies)}')
+
+        for name, value in run_info.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines += [f"# TYPE utm_pipeline_run_{name} gauge", f"utm_pipeline_run_{name} {value}"]
+
+        _write_text_atomic(path, "\n".join(lines) + "\n")
+
+    def summary(self):
+        """One line per stage, busiest first."""
+        return [
+            f"{name}: {entry['seconds']:.2f}s over {entry['count']} calls "
+            f"(mean {entry['seconds'] / entry['count'] * 1000:.1f} ms, max {entry['max_seconds'] * 1000:.1f} ms)"
+            for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+        ]
+
+
+# Shared by every stage of the process's run
+run_metrics = RunMetrics()
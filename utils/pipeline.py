@@ -0,0 +1,228 @@
+import asyncio
+from collections import deque
+
+from utils.data_mapper import DataMapper
+from utils.metrics import run_metrics
+from utils.reporter import reporter
+from utils.sinks import SinkWriteError
+
+
+class DayPipeline:
+    """
+    Streams one day's subscribers through enrichment into the sinks.
+
+    Pages are handed out subscriber by subscriber to a fixed pool of workers,
+    each doing every enrichment call for its subscriber on the shared session,
+    and enriched rows are flushed in chunks. Pagination, enrichment and writes
+    overlap, and memory stays bounded by the queue sizes and the chunk size
+    however large the day is.
+    """
+
+    def __init__(self, subscriber_fetcher, location_fetcher, referrer_info_fetcher, write_rows,
+                 chunk_size=5000, queue_size=2, enrich_workers=12, checkpoint=None, hourly=False,
+                 high_water_mark=None, sink_names=()):
+        """
+        Args:
+            subscriber_fetcher (SubscriberFetcher): Source of subscriber pages.
+            location_fetcher (LocationFetcher): Location enrichment.
+            referrer_info_fetcher (ReferrerInfoFetcher): Referrer enrichment.
+            write_rows (callable): Coroutine function receiving a RowBatch and the names of sinks to skip,
+                returning the names of the sinks written (see SinkFanout.write).
+            chunk_size (int): Enriched subscribers per sink write.
+            queue_size (int): Pages buffered ahead of the workers.
+            enrich_workers (int): Subscribers enriched concurrently.
+            checkpoint (PaginationCheckpoint): Receives each window's cursor once its pages are written,
+                and the ids each sink has written, so a resumed run skips rows it already wrote.
+            hourly (bool): Paginate the day as concurrent hourly sub-windows.
+            high_water_mark (HighWaterMark): Skips subscribers earlier runs wrote, records each
+                written chunk, and is advanced once the whole window is written.
+        """
+        self.subscriber_fetcher = subscriber_fetcher
+        self.location_fetcher = location_fetcher
+        self.referrer_info_fetcher = referrer_info_fetcher
+        self.write_rows = write_rows
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.enrich_workers = enrich_workers
+        self.checkpoint = checkpoint
+        self.hourly = hourly
+        self.high_water_mark = high_water_mark
+        self.sink_names = set(sink_names)
+
+    async def enrich_subscriber(self, subscriber, session):
+        """Attach location and referrer info to one filtered subscriber; both lookups run together"""
+        # The listed custom fields only feed the UTM fallback; they are not written
+        listed_fields = subscriber.pop("fields", None)
+        (_, _, state, country), (_, referrer_info) = await asyncio.gather(
+            self.location_fetcher.fetch_location(session, subscriber["id"]),
+            self.referrer_info_fetcher.fetch_referrer_info(session, subscriber["id"], listed_fields),
+        )
+        subscriber["location_state"] = state
+        subscriber["location_country"] = country
+        subscriber["referrer_info"] = referrer_info
+        return subscriber
+
+    async def run(self, day_start, day_end, session, write_after=None, closed=True):
+        """
+        Fetch, enrich and write every subscriber created in the window.
+
+        Args:
+            day_start (str): Window start in ISO format.
+            day_end (str): Window end in ISO format.
+            session (aiohttp.ClientSession): Shared run session.
+            write_after (asyncio.Event): Awaited before the first write so days stay in order.
+            closed (bool): No more subscribers can appear in the window. An open window (today)
+                keeps its checkpoint, so the next run resumes after what this one wrote.
+
+        Returns:
+            int: Number of subscribers written.
+        """
+        day = day_start[:10]
+        pages = asyncio.Queue(maxsize=self.queue_size)
+        subscribers = asyncio.Queue(maxsize=self.enrich_workers * 2)
+        # One chunk of slack keeps the workers busy while a chunk is being written
+        enriched = asyncio.Queue(maxsize=self.chunk_size)
+        written = 0
+        # Subscribers already queued this run, so one listed twice is only written once
+        seen_ids = set()
+        # Rows still unwritten per page, each page's window, and each window's pages in cursor order
+        unwritten = {}
+        page_windows = {}
+        window_pages = {}
+        # Subscribers a failed earlier run wrote to some of the sinks: id -> those sinks
+        partly_written = {}
+
+        def commit_cursors():
+            if self.checkpoint is None:
+                return
+            for window, queued in window_pages.items():
+                cursor = None
+                while queued and unwritten[queued[0][0]] == 0:
+                    seq, cursor = queued.popleft()
+                    del unwritten[seq]
+                if cursor:
+                    self.checkpoint.save(window, cursor)
+
+        def drop_written(subscribers, window):
+            kept = []
+            for subscriber in subscribers:
+                if subscriber["id"] in seen_ids:
+                    reporter.count("duplicate subscribers skipped")
+                    continue
+                if self.high_water_mark is not None and self.high_water_mark.is_emitted(subscriber):
+                    reporter.count("subscribers skipped below high-water mark")
+                    continue
+                if self.checkpoint is not None:
+                    # Pages after the checkpointed cursor can hold rows an earlier run already wrote
+                    sinks = self.checkpoint.written_to(window, subscriber["id"])
+                    if sinks and sinks >= self.sink_names:
+                        reporter.count("subscribers skipped as already written")
+                        continue
+                    if sinks:
+                        partly_written[subscriber["id"]] = frozenset(sinks)
+                seen_ids.add(subscriber["id"])
+                kept.append(subscriber)
+            return kept
+
+        async def produce():
+            seq = 0
+            async for page in self.subscriber_fetcher.iter_subscriber_pages(
+                    day_start, day_end, session=session, checkpoint=self.checkpoint, hourly=self.hourly):
+                seq += 1
+                filtered = await self.subscriber_fetcher.filter_subscribers(page.subscribers)
+                filtered = drop_written(filtered, page.window)
+                unwritten[seq] = len(filtered)
+                page_windows[seq] = page.window
+                reporter.advance(day, "fetched", len(filtered))
+                window_pages.setdefault(page.window, deque()).append((seq, page.end_cursor))
+                if filtered:
+                    await pages.put((seq, filtered))
+            await pages.put(None)
+
+        async def dispatch():
+            while True:
+                item = await pages.get()
+                if item is None:
+                    break
+                seq, batch = item
+                reporter.debug(f"Enriching {len(batch)} subscribers...")
+                for subscriber in batch:
+                    await subscribers.put((seq, subscriber))
+            for _ in range(self.enrich_workers):
+                await subscribers.put(None)
+
+        async def enrich():
+            while True:
+                item = await subscribers.get()
+                if item is None:
+                    break
+                seq, subscriber = item
+                subscriber = await self.enrich_subscriber(subscriber, session)
+                reporter.advance(day, "enriched")
+                await enriched.put((seq, subscriber))
+
+        async def enrich_all():
+            await asyncio.gather(*(enrich() for _ in range(self.enrich_workers)))
+            await enriched.put(None)
+
+        def record_written(group, sinks):
+            if self.checkpoint is None or not sinks:
+                return
+            window_ids = {}
+            for seq, subscriber in group:
+                window_ids.setdefault(page_windows[seq], []).append(subscriber["id"])
+            self.checkpoint.record(window_ids, sinks)
+
+        async def flush(chunk):
+            nonlocal written
+            if write_after is not None and written == 0:
+                await write_after.wait()
+            # Normally one group; rows a failed run left in some sinks only go to the others
+            groups = {}
+            for item in chunk:
+                groups.setdefault(partly_written.get(item[1]["id"], frozenset()), []).append(item)
+            for skip, group in groups.items():
+                with run_metrics.stage("mapping"):
+                    batch = DataMapper.build_rows([subscriber for _, subscriber in group])
+                try:
+                    sinks = await self.write_rows(batch, skip=skip)
+                except SinkWriteError as e:
+                    record_written(group, e.written)
+                    raise
+                record_written(group, sinks)
+            written += len(chunk)
+            reporter.advance(day, "written", len(chunk))
+            if self.high_water_mark is not None:
+                self.high_water_mark.record(subscriber for _, subscriber in chunk)
+            for seq, _ in chunk:
+                unwritten[seq] -= 1
+            commit_cursors()
+
+        async def write():
+            buffer = []
+            while True:
+                item = await enriched.get()
+                if item is None:
+                    break
+                buffer.append(item)
+                if len(buffer) >= self.chunk_size:
+                    await flush(buffer)
+                    buffer = []
+            if buffer:
+                await flush(buffer)
+
+        tasks = [asyncio.create_task(stage()) for stage in (produce, dispatch, enrich_all, write)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        # The whole day is written; the completed-days record takes over from the cursors
+        if self.checkpoint is not None and closed:
+            windows = self.subscriber_fetcher.split_windows(day_start, day_end, self.hourly)
+            self.checkpoint.clear([self.subscriber_fetcher.window_key(*window) for window in windows])
+        if self.high_water_mark is not None:
+            self.high_water_mark.advance()
+        return written
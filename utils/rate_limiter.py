@@ -0,0 +1,175 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from config import settings
+
+RETRYABLE_EXCEPTIONS = (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header as seconds to wait, or None if absent/unparseable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter with retries for a single host.
+
+    The number of in-flight requests grows by roughly one per window of healthy
+    responses and is halved on 429s, 5xx responses and timeouts. A Retry-After
+    header pauses every request to the host until it has elapsed.
+    """
+
+    def __init__(self, name, initial=3, minimum=1, maximum=10, max_retries=4,
+                 backoff_base=1.0, backoff_max=60.0, decrease_factor=0.5):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.decrease_factor = decrease_factor
+
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._slot_freed = asyncio.Event()
+
+    @classmethod
+    def from_settings(cls, host, maximum=None, max_retries=None):
+        budget = dict(settings.rate_limits[host])
+        if maximum is not None:
+            budget["maximum"] = maximum
+            budget["initial"] = min(budget["initial"], maximum)
+        return cls(
+            host,
+            max_retries=settings.max_retries if max_retries is None else max_retries,
+            backoff_base=settings.backoff_base,
+            backoff_max=settings.backoff_max,
+            **budget
+        )
+
+    async def _acquire(self):
+        while True:
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            if self._in_flight < int(self.limit):
+                self._in_flight += 1
+                return
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+
+    def _release(self, healthy):
+        self._in_flight -= 1
+        if healthy:
+            # Additive increase: about +1 after a full window of successes
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._slot_freed.set()
+
+    def _back_off(self, retry_after=None):
+        now = time.monotonic()
+        # Multiplicative decrease, at most once per second so a burst of 429s counts once
+        if now - self._last_decrease >= 1.0:
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            self._last_decrease = now
+        if retry_after:
+            self._resume_at = max(self._resume_at, now + retry_after)
+
+    def _retry_delay(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @asynccontextmanager
+    async def request(self, session, method, url, **kwargs):
+        """
+        Issue a request under this host's budget, retrying throttled and failed attempts.
+
+        Args:
+            session (aiohttp.ClientSession): Session to issue the request on.
+            method (str): HTTP method.
+            url (str): Request URL.
+            **kwargs: Passed through to session.request.
+
+        Yields:
+            aiohttp.ClientResponse: The final response. A 429/5xx is yielded once retries run out.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._acquire()
+            self.requests += 1
+            try:
+                response = await session.request(method, url, **kwargs)
+            except RETRYABLE_EXCEPTIONS:
+                self._release(healthy=False)
+                self._back_off()
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            except BaseException:
+                # Any other error or a cancellation still gives the slot back
+                self._release(healthy=False)
+                raise
+
+            healthy = response.status != 429 and response.status < 500
+            if not healthy and attempt < self.max_retries:
+                if response.status == 429:
+                    self.throttled += 1
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response.release()
+                self._release(healthy=False)
+                self._back_off(retry_after)
+                self.retries += 1
+                await asyncio.sleep(retry_after if retry_after is not None else self._retry_delay(attempt))
+                continue
+
+            if not healthy:
+                self.failures += 1
+            try:
+                yield response
+            finally:
+                response.release()
+                self._release(healthy)
+                if not healthy:
+                    self._back_off()
+            return
+
+    def summary(self):
+        return (f"{self.name}: concurrency {self.limit:.1f}/{self.maximum}, {self.requests} requests, "
+                f"{self.retries} retries, {self.throttled} throttled, {self.failures} failed")
+
+
+def build_limiters(api_max_concurrent=None, app_max_concurrent=None, max_retries=None):
+    """
+    Build the per-host budgets for a run.
+
+    Returns:
+        dict: Host name to AdaptiveLimiter for api.kit.com and app.kit.com.
+    """
+    return {
+        "api.kit.com": AdaptiveLimiter.from_settings("api.kit.com", maximum=api_max_concurrent, max_retries=max_retries),
+        "app.kit.com": AdaptiveLimiter.from_settings("app.kit.com", maximum=app_max_concurrent, max_retries=max_retries),
+    }
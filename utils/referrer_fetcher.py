@@ -1,49 +1,79 @@
 import aiohttp
 import asyncio
-from rich.console import Console
 from utils.helpers import *
+from utils.http_session import session_scope
+from utils.fields_lookup import FieldsLookup
+from utils.rate_limiter import AdaptiveLimiter
+from utils.single_flight import SingleFlight
+from utils.utm_normalizer import normalizer
+from utils.metrics import run_metrics
+from utils.reporter import reporter
+from config.settings import utm_fallback_max_concurrent, app_base_url, base_url as api_base_url
 
 class ReferrerInfoFetcher:
-    def __init__(self, headers, base_url="https://app.kit.com/subscribers"):
+    def __init__(self, headers, base_url=app_base_url, fields_max_concurrent=utm_fallback_max_concurrent,
+                 limiter=None, fields_limiter=None, enrichment_cache=None, fields_base_url=api_base_url,
+                 single_flight=None, fields_lookup=None):
         self.headers = headers
         self.base_url = base_url
-        self.console = Console()
+        self.limiter = limiter or AdaptiveLimiter.from_settings("app.kit.com")
+        # Referrer info of subscribers seen by earlier runs, fallback UTMs included
+        self.enrichment_cache = enrichment_cache
+        # Requests for a subscriber already in flight or fetched this run are shared, not repeated
+        self.single_flight = single_flight or SingleFlight()
+        # Custom fields for the UTM fallback: from the list page when it had them, else /v4/subscribers/{id}
+        self.fields_lookup = fields_lookup or FieldsLookup(api_base_url=fields_base_url, limiter=fields_limiter,
+                                                           max_concurrent=fields_max_concurrent,
+                                                           single_flight=self.single_flight)
 
-    async def fetch_referrer_info(self, session, subscriber_id):
+    async def fetch_referrer_info(self, session, subscriber_id, listed_fields=None):
+        if self.enrichment_cache is not None:
+            cached = self.enrichment_cache.get("referrer", subscriber_id)
+            if cached is not None:
+                return subscriber_id, cached
+
+        return await self.single_flight.do("referrer", subscriber_id,
+                                           lambda: self.request_referrer_info(session, subscriber_id, listed_fields),
+                                           keep=lambda result: result[1] is not None)
+
+    async def request_referrer_info(self, session, subscriber_id, listed_fields=None):
+        """Fetch referrer info (with the UTM fields fallback) and record it in the enrichment cache"""
         url = f"{self.base_url}/{subscriber_id}/referrer_info"
         try:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status != 200:
-                    self.console.print(f"[red]Failed for ID {subscriber_id}: {response.status}")
-                    return subscriber_id, None
-
-                referrer_info = await response.json()
-                if referrer_info["origin"]["name"] == None:
-                    referrer_info["origin"]["name"] = "Weekly Webinar Registration Form"
-                subscriber_fields = get_subscribers_fields(subscriber_id)
-                if referrer_info["referrer_utm"]["source"] == "" :
-                       
-                   referrer_info["referrer_utm"]["source"] , referrer_info["referrer_utm"]["medium"] ,referrer_info["referrer_utm"]["content"], referrer_info["referrer_utm"]["campaign"] = extract_utms(subscriber_fields)
-                
-                return subscriber_id, referrer_info
+            with run_metrics.stage("referrer_fetch"):
+                async with self.limiter.request(session, "GET", url, headers=self.headers) as response:
+                    if response.status != 200:
+                        reporter.debug(f"Referrer info failed for ID {subscriber_id}: {response.status}")
+                        reporter.count("referrer fetches failed", failure=True)
+                        return subscriber_id, None
+
+                    referrer_info = await response.json()
+
+            if referrer_info["origin"]["name"] == None:
+                referrer_info["origin"]["name"] = "Weekly Webinar Registration Form"
+            if referrer_info["referrer_utm"]["source"] == "" :
+                with run_metrics.stage("utm_fallback"):
+                    fields = await self.fields_lookup.fields(session, subscriber_id, listed_fields)
+                referrer_info["referrer_utm"].update(normalizer.normalize_fields(fields))
+            
+            if self.enrichment_cache is not None:
+                self.enrichment_cache.put("referrer", subscriber_id, referrer_info)
+            return subscriber_id, referrer_info
             
         except Exception as e:      
-            self.console.print(f"[red]Error fetching {subscriber_id}: {e}")
-            return subscriber_id, None
-
-        except Exception as e:
-            self.console.print(f"[red]Error fetching {subscriber_id}: {e}")
+            reporter.debug(f"Error fetching referrer info for {subscriber_id}: {e}")
+            reporter.count("referrer fetches failed", failure=True)
             return subscriber_id, None
 
-    async def fetch_all_referrer_info(self, subscriber_ids, max_concurrent=3):
+    async def fetch_all_referrer_info(self, subscriber_ids, max_concurrent=None, session=None):
         results = {}
-        semaphore = asyncio.Semaphore(max_concurrent)
+        semaphore = asyncio.Semaphore(max_concurrent or self.limiter.maximum)
 
         async def fetch_with_semaphore(subscriber_id):
             async with semaphore:
                 return await self.fetch_referrer_info(session, subscriber_id)
         
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(session) as session:
             tasks = [fetch_with_semaphore(sid) for sid in subscriber_ids]
         
             for completed_task in asyncio.as_completed(tasks): 
@@ -0,0 +1,162 @@
+import json
+import sys
+import threading
+import time
+from collections import Counter
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LEVEL_STYLES = {"debug": "dim", "info": None, "warning": "yellow", "error": "bold red"}
+
+# Per-day progress stages, in display order
+STAGES = ("fetched", "enriched", "written")
+
+
+class Reporter:
+    """
+    The one place the pipeline writes its output.
+
+    Messages have levels, and per-request detail is logged at debug so it is
+    hidden by default. Progress is counted per day and stage: in "rich" mode it
+    is drawn as live bars, while "plain" and "json" modes (the default when
+    stdout is not a terminal) print one aggregated progress line per interval
+    instead of a line per request. Failures of individual requests are counted
+    and reported in the run summary.
+    """
+
+    def __init__(self, level="info", mode="auto", progress_interval=30.0):
+        self._console = None
+        self._lock = threading.Lock()
+        self._progress = None
+        self._tasks = {}
+        self.counts = {}
+        self.counters = Counter()
+        self.failures = set()
+        self.configure(level, mode, progress_interval)
+
+    def configure(self, level="info", mode="auto", progress_interval=30.0):
+        """
+        Args:
+            level (str): Lowest level printed: debug, info, warning or error.
+            mode (str): "rich", "plain", "json", or "auto" (rich on a terminal, json otherwise).
+            progress_interval (float): Seconds between aggregated progress lines outside rich mode.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+        if mode == "auto":
+            mode = "rich" if sys.stdout.isatty() else "json"
+        if mode not in ("rich", "plain", "json"):
+            raise ValueError(f"Unknown log format: {mode}")
+        self.level = LEVELS[level]
+        self.mode = mode
+        self.progress_interval = progress_interval
+        self._last_progress_line = time.monotonic()
+
+    @property
+    def console(self):
+        """rich Console, imported and built on first use so plain and json runs never load rich."""
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console()
+        return self._console
+
+    def log(self, level, message, style=None, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if self.mode == "json":
+            event = {"ts": round(time.time(), 3), "level": level, "message": message, **fields}
+            with self._lock:
+                print(json.dumps(event, default=str), flush=True)
+        elif self.mode == "plain":
+            with self._lock:
+                print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {level.upper()} {message}", flush=True)
+        else:
+            console = self._progress.console if self._progress is not None else self.console
+            console.print(message, style=style or LEVEL_STYLES[level], markup=False, highlight=False)
+
+    def debug(self, message, **fields):
+        self.log("debug", message, **fields)
+
+    def info(self, message, style=None, **fields):
+        self.log("info", message, style=style, **fields)
+
+    def warning(self, message, **fields):
+        self.log("warning", message, **fields)
+
+    def error(self, message, **fields):
+        self.log("error", message, **fields)
+
+    def count(self, name, amount=1, failure=False):
+        """
+        Count an event (e.g. a skipped duplicate) for the run summary.
+
+        Args:
+            name (str): Counter name, printed in the summary.
+            amount (int): How much to add.
+            failure (bool): Whether the event is a failure (e.g. a failed location fetch),
+                reported as a warning rather than at info.
+        """
+        self.counters[name] += amount
+        if failure:
+            self.failures.add(name)
+
+    def counter_summary(self):
+        """Print the run counters: failures as warnings, everything else at info."""
+        for name, count in sorted(self.counters.items()):
+            if name in self.failures:
+                self.warning(f"{name}: {count}")
+            else:
+                self.info(f"{name}: {count}")
+
+    def advance(self, day, stage, amount=1):
+        """Record progress of one day's stage (fetched, enriched or written)."""
+        counts = self.counts.setdefault(day, dict.fromkeys(STAGES, 0))
+        counts[stage] += amount
+
+        if self.mode == "rich":
+            self._advance_bar(day, stage, counts)
+        elif time.monotonic() - self._last_progress_line >= self.progress_interval:
+            self._last_progress_line = time.monotonic()
+            self.progress_summary()
+
+    def _advance_bar(self, day, stage, counts):
+        if self._progress is None:
+            from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
+
+            self._progress = Progress(
+                TextColumn("{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TimeElapsedColumn(),
+                console=self.console,
+            )
+            self._progress.start()
+        if day not in self._tasks:
+            self._tasks[day] = {
+                name: self._progress.add_task(f"{day} {name}", total=None) for name in STAGES
+            }
+        tasks = self._tasks[day]
+        # Later stages are measured against what has been fetched so far
+        for name in STAGES[1:]:
+            self._progress.update(tasks[name], total=counts["fetched"])
+        self._progress.update(tasks[stage], completed=counts[stage])
+
+    def progress_summary(self):
+        """Print one aggregated progress line per day."""
+        for day, counts in self.counts.items():
+            self.info(f"{day}: " + ", ".join(f"{counts[name]} {name}" for name in STAGES), day=day, **counts)
+
+    def finish_day(self, day):
+        if self.mode != "rich" and day in self.counts:
+            counts = self.counts[day]
+            self.info(f"{day} done: " + ", ".join(f"{counts[name]} {name}" for name in STAGES), day=day, **counts)
+
+    def close(self):
+        """Stop the live display; call before printing the run summary."""
+        if self._progress is not None:
+            self._progress.stop()
+            self._progress = None
+
+
+# Shared by the whole process; main.py configures it from the command line
+reporter = Reporter()
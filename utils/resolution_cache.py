@@ -0,0 +1,97 @@
+import os
+import sqlite3
+from collections import OrderedDict
+
+
+class ResolutionCache:
+    """
+    Bounded LRU of (city, state) -> country resolutions.
+
+    When a SQLite path is given the cache is warmed from it at startup and new
+    resolutions are written back on flush. The store is wiped whenever the
+    Countries Metadata hash it was built against changes.
+    """
+
+    def __init__(self, metadata_hash, max_size=4096, db_path=None):
+        self.metadata_hash = metadata_hash
+        self.max_size = max_size
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._conn = None
+
+        if db_path:
+            self._open_store()
+            self.warm()
+
+    def _open_store(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resolutions ("
+            "city TEXT NOT NULL, state TEXT NOT NULL, country TEXT NOT NULL, "
+            "PRIMARY KEY (city, state))"
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'metadata_hash'").fetchone()
+        if row is None or row[0] != self.metadata_hash:
+            # Metadata changed since these resolutions were computed
+            self._conn.execute("DELETE FROM resolutions")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('metadata_hash', ?)",
+                (self.metadata_hash,)
+            )
+        self._conn.commit()
+
+    def warm(self):
+        """Load up to max_size stored resolutions into memory."""
+        if self._conn is None:
+            return
+        rows = self._conn.execute(
+            "SELECT city, state, country FROM resolutions LIMIT ?", (self.max_size,)
+        )
+        for city, state, country in rows:
+            self._entries[(city, state)] = country
+
+    def get(self, city, state):
+        key = (city, state)
+        country = self._entries.get(key)
+        if country is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return country
+
+    def put(self, city, state, country):
+        key = (city, state)
+        self._entries[key] = country
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        if self._conn is not None:
+            self._pending[key] = country
+
+    def flush(self):
+        """Persist resolutions computed since the last flush."""
+        if self._conn is None or not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO resolutions (city, state, country) VALUES (?, ?, ?)",
+            [(city, state, country) for (city, state), country in self._pending.items()]
+        )
+        self._conn.commit()
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": hit_rate}
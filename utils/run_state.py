@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: incremental runs are not guarded against overlap
+    fcntl = None
+
+
+def _write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path, default):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return default
+
+
+class CompletedDays:
+    """
+    Persistent record of the days whose rows have already been written.
+
+    A restarted backfill consults it to skip days that are already in the sinks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._days = set(_read_json(path, []))
+
+    def __contains__(self, day):
+        return day in self._days
+
+    def mark(self, day):
+        """Record a day as written and persist the record atomically."""
+        with self._lock:
+            self._days.add(day)
+            if self.path:
+                _write_json_atomic(self.path, sorted(self._days))
+
+
+class PaginationCheckpoint:
+    """
+    Last written pagination cursor per date window, and the subscribers written past it.
+
+    A cursor is only saved once every subscriber on the pages up to it has been
+    written, so a rerun can resume after it without losing rows. Chunks mix rows
+    from several pages, so the ids each sink has written in a window are
+    recorded too, and a rerun skips them on the pages it fetches again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        state = _read_json(path, {})
+        if "cursors" not in state:
+            # Written before ids were recorded: the file is the cursor map itself
+            state = {"cursors": state, "written": {}}
+        self._cursors = state["cursors"]
+        self._written = {window: {sink: set(ids) for sink, ids in sinks.items()}
+                         for window, sinks in state["written"].items()}
+
+    def _persist(self):
+        if self.path:
+            _write_json_atomic(self.path, {
+                "cursors": self._cursors,
+                "written": {window: {sink: sorted(ids) for sink, ids in sinks.items()}
+                            for window, sinks in self._written.items()},
+            })
+
+    def get(self, window):
+        return self._cursors.get(window)
+
+    def save(self, window, cursor):
+        with self._lock:
+            self._cursors[window] = cursor
+            self._persist()
+
+    def written_to(self, window, subscriber_id):
+        """Names of the sinks that already have this subscriber of the window."""
+        return {sink for sink, ids in self._written.get(window, {}).items() if subscriber_id in ids}
+
+    def record(self, window_ids, sink_names):
+        """
+        Persist that subscribers were written to the given sinks.
+
+        Args:
+            window_ids (dict): Window key -> ids of the written subscribers.
+            sink_names (iterable): Sinks that accepted them.
+        """
+        with self._lock:
+            for window, ids in window_ids.items():
+                sinks = self._written.setdefault(window, {})
+                for sink in sink_names:
+                    sinks.setdefault(sink, set()).update(ids)
+            self._persist()
+
+    def clear(self, windows):
+        """Forget the cursors and written ids of windows that are fully written."""
+        with self._lock:
+            for window in windows:
+                self._cursors.pop(window, None)
+                self._written.pop(window, None)
+            self._persist()
+
+
+class HighWaterMark:
+    """
+    Newest subscriber created_at written by incremental runs, with the ids written at it.
+
+    created_at has one-second resolution, so the ids at the mark tell the next
+    run which subscribers of that second are already in the sinks. The mark only
+    moves once a run's whole window is written, but every written chunk is
+    recorded as it lands, so a run retried after a failure skips what the
+    failed run already wrote instead of appending it to the sinks again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._lock_file = None
+        state = _read_json(path, {})
+        self.created_at = state.get("created_at")
+        self.ids = set(state.get("ids", []))
+        # Subscribers above the mark written by a run whose window is not complete yet: id -> created_at
+        self.written = {subscriber_id: created_at for subscriber_id, created_at in state.get("written", [])}
+
+    def _persist(self):
+        if self.path:
+            _write_json_atomic(self.path, {
+                "created_at": self.created_at,
+                "ids": sorted(self.ids),
+                "written": sorted(self.written.items(), key=lambda item: (item[1] or "", item[0])),
+            })
+
+    def is_emitted(self, subscriber):
+        """Whether an earlier run already wrote this subscriber."""
+        if subscriber.get("id") in self.written:
+            return True
+        created_at = subscriber.get("created_at")
+        if self.created_at is None or not created_at:
+            return False
+        return created_at < self.created_at or (created_at == self.created_at and subscriber.get("id") in self.ids)
+
+    def record(self, subscribers):
+        """
+        Persist that a chunk of subscribers has been written, before the window is complete.
+
+        Args:
+            subscribers (iterable): Written subscribers with id and created_at.
+        """
+        with self._lock:
+            for subscriber in subscribers:
+                self.written[subscriber["id"]] = subscriber.get("created_at")
+            self._persist()
+
+    def advance(self):
+        """
+        Move the mark to the newest recorded subscriber once the whole window is written,
+        and persist it atomically.
+        """
+        with self._lock:
+            newest = max((created_at for created_at in self.written.values() if created_at), default=None)
+            if newest is not None and (self.created_at is None or newest > self.created_at):
+                self.created_at, self.ids = newest, set()
+            if self.created_at is not None:
+                self.ids.update(subscriber_id for subscriber_id, created_at in self.written.items()
+                                if created_at == self.created_at)
+            self.written = {subscriber_id: created_at for subscriber_id, created_at in self.written.items()
+                            if created_at and (self.created_at is None or created_at > self.created_at)}
+            self._persist()
+
+    def acquire(self):
+        """
+        Take the run lock so two incremental runs never write the same window.
+
+        Returns:
+            bool: False if another run holds it.
+        """
+        if not self.path or fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+
+    def release(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+# Output columns shared by every sink, in the order they are written
+COLUMN_ORDER = [
+    "subscriber_created_at",
+    "subscriber_state",
+    "subscriber_email",
+    "referrer_name",
+    "referrer_domain",
+    "referrer_utm_source",
+    "referrer_utm_medium",
+    "referrer_utm_campaign",
+    "referrer_utm_content",
+    "subscriber_physical_state",
+    "subscriber_country",
+    "Subscriber Region",
+    "Subscriber Purchase Power",
+    "Subscriber Purchase Score"
+]
+
+CREATED_AT_COLUMN = "subscriber_created_at"
+
+EXCEL_EPOCH = date(1900, 1, 1)
+
+
+def serial_to_date(serial):
+    """Excel serial (as produced by DataMapper) to YYYY-MM-DD; None stays "N/A"."""
+    if serial is None:
+        return "N/A"
+    return (EXCEL_EPOCH + timedelta(days=serial - 2)).isoformat()
+
+
+class RowBatch:
+    """
+    Columnar output rows for one chunk of subscribers.
+
+    columns holds every COLUMN_ORDER column, with subscriber_created_at as an
+    Excel serial. created_dates holds the same timestamps as YYYY-MM-DD, which
+    is the form the sinks write.
+    """
+
+    def __init__(self, columns, created_dates):
+        self.columns = columns
+        self.created_dates = created_dates
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a batch from DataMapper.combine_data style records."""
+        columns = {name: [record.get(name) for record in records] for name in COLUMN_ORDER}
+        return cls(columns, [serial_to_date(serial) for serial in columns[CREATED_AT_COLUMN]])
+
+    def __len__(self):
+        return len(self.created_dates)
+
+    def _output_column(self, name):
+        if name == CREATED_AT_COLUMN:
+            return self.created_dates
+        return ["N/A" if value is None else value for value in self.columns[name]]
+
+    def rows(self, column_order=COLUMN_ORDER):
+        """Rows as lists in column_order, missing values as "N/A"."""
+        return [list(row) for row in zip(*(self._output_column(name) for name in column_order))]
+
+    def records(self, column_order=COLUMN_ORDER):
+        """Rows as dicts keyed by column name, missing values as "N/A"."""
+        return [dict(zip(column_order, row)) for row in zip(*(self._output_column(name) for name in column_order))]
@@ -0,0 +1,82 @@
+import asyncio
+from collections import Counter, OrderedDict
+
+
+class SingleFlight:
+    """
+    Coalesces requests for the same (endpoint, id) within a run.
+
+    Concurrent callers asking for the same key share one in-flight task, and a
+    completed result is handed to later callers instead of being fetched again.
+    Results a `keep` check rejects (failed fetches) are not reused, so the next
+    caller retries. Kept results are bounded by max_results, least recently
+    used first out.
+    """
+
+    def __init__(self, max_results=100000):
+        """
+        Args:
+            max_results (int): Completed results kept for reuse.
+        """
+        self.max_results = max_results
+        self.calls = Counter()
+        self.coalesced = Counter()
+        self.reused = Counter()
+        self._in_flight = {}
+        self._results = OrderedDict()
+
+    async def do(self, endpoint, key, fetch, keep=None):
+        """
+        Run fetch() unless the same request is already in flight or done.
+
+        Args:
+            endpoint (str): Kind of request, e.g. "location".
+            key: Identity of the request within the endpoint, e.g. the subscriber id.
+            fetch (callable): Coroutine function making the request.
+            keep (callable): Whether a result may be reused; every result is when omitted.
+
+        Returns:
+            The result of the shared fetch.
+        """
+        flight_key = (endpoint, key)
+        self.calls[endpoint] += 1
+
+        if flight_key in self._results:
+            self._results.move_to_end(flight_key)
+            self.reused[endpoint] += 1
+            return self._results[flight_key]
+
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda done: self._landed(flight_key, done, keep))
+        else:
+            self.coalesced[endpoint] += 1
+        # Shielded so a cancelled caller does not cancel the request the others are waiting on
+        return await asyncio.shield(task)
+
+    def _landed(self, flight_key, task, keep):
+        self._in_flight.pop(flight_key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if keep is None or keep(result):
+            self._results[flight_key] = result
+            if len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def suppressed(self):
+        """Requests that were not made because an identical one was in flight or done."""
+        return sum(self.coalesced.values()) + sum(self.reused.values())
+
+    def stats(self):
+        return {
+            endpoint: {"calls": calls, "coalesced": self.coalesced[endpoint], "reused": self.reused[endpoint]}
+            for endpoint, calls in sorted(self.calls.items())
+        }
+
+    def summary(self):
+        parts = [f"{endpoint} {s['coalesced']} in flight + {s['reused']} done of {s['calls']}"
+                 for endpoint, s in self.stats().items()]
+        return f"suppressed {self.suppressed()} duplicate requests" + (f": {', '.join(parts)}" if parts else "")
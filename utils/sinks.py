@@ -0,0 +1,212 @@
+import asyncio
+import csv
+import importlib.util
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import csv_sink_path, parquet_sink_dir, sink_retries
+from utils.schema import COLUMN_ORDER
+from utils.metrics import run_metrics
+from utils.reporter import reporter
+
+
+class Sink:
+    """
+    An output destination for combined subscriber rows.
+
+    write() is called from a worker thread with a RowBatch built by
+    DataMapper.build_rows and must not modify it. finalize() runs once on the
+    event loop after the last write of the run.
+    """
+
+    name = "sink"
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def problems(self):
+        """Configuration problems that would make every write fail, for the dry-run health check."""
+        return []
+
+    async def finalize(self):
+        pass
+
+
+class SheetsSink(Sink):
+    name = "sheets"
+
+    def __init__(self, spreadsheet_submitter):
+        self.spreadsheet_submitter = spreadsheet_submitter
+
+    def write(self, batch):
+        self.spreadsheet_submitter.append_rows(batch.rows())
+
+
+class SupabaseSink(Sink):
+    name = "supabase"
+
+    def __init__(self, supabase_submitter):
+        self.supabase_submitter = supabase_submitter
+
+    def write(self, batch):
+        self.supabase_submitter.upsert_records(batch.records())
+
+    async def finalize(self):
+        # Notify downstream once for the whole run, after the last batch
+        if self.supabase_submitter.records_submitted:
+            await self.supabase_submitter.trigger_webhook()
+
+
+class CsvSink(Sink):
+    name = "csv"
+
+    def __init__(self, path=csv_sink_path):
+        self.path = path
+
+    def write(self, batch):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(COLUMN_ORDER)
+            writer.writerows(batch.rows())
+
+
+class ParquetSink(Sink):
+    name = "parquet"
+
+    def __init__(self, directory=parquet_sink_dir):
+        self.directory = directory
+
+    def problems(self):
+        # Checked without importing, so the health check stays cheap
+        if importlib.util.find_spec("pandas") is None:
+            return ["parquet sink needs pandas, which is not installed"]
+        if importlib.util.find_spec("pyarrow") is None and importlib.util.find_spec("fastparquet") is None:
+            return ["parquet sink needs pyarrow or fastparquet, neither is installed"]
+        return []
+
+    def write(self, batch):
+        # pandas/pyarrow are only needed when this sink is enabled
+        import pandas as pd
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"subscribers-{time.time_ns()}.parquet")
+        pd.DataFrame(batch.rows(), columns=COLUMN_ORDER).astype(str).to_parquet(path, index=False)
+
+
+class SinkWriteError(RuntimeError):
+    """A chunk that some sinks failed to write; `written` names the sinks that did write it."""
+
+    def __init__(self, message, written):
+        super().__init__(message)
+        self.written = written
+
+
+class SinkFanout:
+    """
+    Writes each chunk to every sink concurrently on a thread pool.
+
+    Every sink gets its own retries and timings, so a slow or failing sink does
+    not hold up the others. A sink that still fails after its retries fails the
+    write once all sinks have finished, naming the sinks that did write the
+    chunk so a rerun can leave them out.
+    """
+
+    def __init__(self, sinks, retries=sink_retries):
+        self.sinks = sinks
+        self.retries = retries
+        self.stats = {sink.name: {"writes": 0, "rows": 0, "seconds": 0.0, "retries": 0, "failures": 0} for sink in sinks}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(sinks)), thread_name_prefix="sink")
+
+    @property
+    def names(self):
+        return [sink.name for sink in self.sinks]
+
+    async def write(self, batch, skip=()):
+        """
+        Write a chunk to every sink not in skip.
+
+        Args:
+            batch (RowBatch): The chunk.
+            skip (iterable): Names of sinks that already have it.
+
+        Returns:
+            list: Names of the sinks written.
+
+        Raises:
+            SinkWriteError: If a sink failed after its retries.
+        """
+        sinks = [sink for sink in self.sinks if sink.name not in skip]
+        results = await asyncio.gather(
+            *(self._write_sink(sink, batch) for sink in sinks),
+            return_exceptions=True
+        )
+        written = [sink.name for sink, result in zip(sinks, results) if not isinstance(result, BaseException)]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise SinkWriteError(str(result), written) from result
+        return written
+
+    async def _write_sink(self, sink, batch):
+        loop = asyncio.get_running_loop()
+        stats = self.stats[sink.name]
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._executor, sink.write, batch)
+            except Exception as e:
+                stats["seconds"] += time.perf_counter() - start
+                if attempt == self.retries:
+                    stats["failures"] += 1
+                    raise RuntimeError(f"{sink.name} sink failed after {attempt + 1} attempts: {e}") from e
+                stats["retries"] += 1
+                reporter.warning(f"{sink.name} sink write failed ({e}), retrying...")
+                await asyncio.sleep(2 ** attempt)
+                continue
+            elapsed = time.perf_counter() - start
+            stats["seconds"] += elapsed
+            run_metrics.record(f"{sink.name}_write", elapsed)
+            stats["writes"] += 1
+            stats["rows"] += len(batch)
+            return
+
+    async def finalize(self):
+        await asyncio.gather(*(sink.finalize() for sink in self.sinks))
+        self._executor.shutdown(wait=True)
+
+    def summary(self):
+        return [
+            f"{name}: {stats['rows']} rows in {stats['writes']} writes, {stats['seconds']:.2f}s, "
+            f"{stats['retries']} retries, {stats['failures']} failures"
+            for name, stats in self.stats.items()
+        ]
+
+
+def build_sinks(names, spreadsheet_submitter=None, supabase_submitter=None):
+    """
+    Instantiate the configured sinks.
+
+    Args:
+        names (list): Sink names from settings.sinks or --sinks.
+        spreadsheet_submitter (SpreadsheetSubmitter): Required for "sheets".
+        supabase_submitter (SupabaseSubmitter): Required for "supabase".
+
+    Returns:
+        list: Sink instances in the given order.
+    """
+    sinks = []
+    for name in names:
+        if name == "sheets":
+            sinks.append(SheetsSink(spreadsheet_submitter))
+        elif name == "supabase":
+            sinks.append(SupabaseSink(supabase_submitter))
+        elif name == "csv":
+            sinks.append(CsvSink())
+        elif name == "parquet":
+            sinks.append(ParquetSink())
+        else:
+            raise ValueError(f"Unknown sink: {name}")
+    return sinks
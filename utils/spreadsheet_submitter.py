@@ -1,10 +1,11 @@
-import pandas as pd
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-from utils.supabase_submitter import SupabaseSubmitter
+import threading
+
+from config.settings import sheets_append_chunk_rows
+from utils.schema import COLUMN_ORDER
+from utils.reporter import reporter
 
 class SpreadsheetSubmitter:
-    def __init__(self, credentials_path, spreadsheet_id, tab_name):
+    def __init__(self, credentials_path, spreadsheet_id, tab_name, append_chunk_rows=sheets_append_chunk_rows):
         """
         Initialize the SpreadsheetSubmitter.
 
@@ -12,46 +13,72 @@ class SpreadsheetSubmitter:
             credentials_path (str): Path to the Google Service Account credentials JSON file.
             spreadsheet_id (str): ID of the Google Spreadsheet.
             tab_name (str): Name of the tab to append data.
+            append_chunk_rows (int): Maximum rows sent in a single append request.
         """
-        self.credentials = Credentials.from_service_account_file(
-            credentials_path,
-            scopes=["https://www.googleapis.com/auth/spreadsheets"]
-        )
+        self.credentials_path = credentials_path
+        self._credentials = None
         self.spreadsheet_id = spreadsheet_id
         self.tab_name = tab_name
+        self.append_chunk_rows = append_chunk_rows
+        self.rows_appended = 0
+        self._service = None
+        self._has_header = None
+        # The discovery client is not thread-safe and appends must land in order
+        self._lock = threading.Lock()
+
+    @property
+    def credentials(self):
+        """Service-account credentials, loaded on first use."""
+        if self._credentials is None:
+            from google.oauth2.service_account import Credentials
+
+            self._credentials = Credentials.from_service_account_file(
+                self.credentials_path,
+                scopes=["https://www.googleapis.com/auth/spreadsheets"]
+            )
+        return self._credentials
+
+    @property
+    def service(self):
+        """Sheets API client, built once per submitter on its first request."""
+        if self._service is None:
+            # googleapiclient is slow to import; runs without a Sheets write never load it
+            from googleapiclient.discovery import build
+
+            self._service = build('sheets', 'v4', credentials=self.credentials, cache_discovery=False)
+        return self._service
+
+    def _tab_has_header(self, sheet):
+        """Check the first row once; afterwards we know the header is there because we wrote it."""
+        if self._has_header is None:
+            result = sheet.values().get(spreadsheetId=self.spreadsheet_id, range=f"{self.tab_name}!A1:Q1").execute()
+            self._has_header = bool(result.get('values'))
+        return self._has_header
+
+    def append_rows(self, rows, column_order=COLUMN_ORDER):
+        """Append rows (lists in column_order) to the tab."""
+        with self._lock:
+            sheet = self.service.spreadsheets()
+
+            # Add header if sheet is empty
+            data_to_write = [] if self._tab_has_header(sheet) else [list(column_order)]
+            data_to_write += rows
+
+            # Let the append endpoint find the end of the table instead of reading the whole tab
+            range_to_write = f"{self.tab_name}!A1"
+            for start in range(0, len(data_to_write), self.append_chunk_rows):
+                chunk = data_to_write[start:start + self.append_chunk_rows]
+                request = sheet.values().append(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=range_to_write,
+                    valueInputOption="USER_ENTERED",
+                    insertDataOption="INSERT_ROWS",
+                    body={"values": chunk}
+                )
+                response = request.execute()
+                self._has_header = True
+                updated_rows = response.get('updates', {}).get('updatedRows', len(chunk))
+                self.rows_appended += updated_rows
+                reporter.debug(f"Appended {updated_rows} rows at {response.get('updates', {}).get('updatedRange', range_to_write)}")
 
-    def write_to_google_sheet(self, data, column_order):
-        # Convert data to DataFrame and align with column order
-        data_frame = pd.DataFrame(data)
-        data_frame = data_frame[column_order]
-        data_frame = data_frame.fillna("N/A")  # Replace None values with 'N/A'
-
-        # Submit to Supabase
-        SupabaseSubmitter(data_frame).submit_df()
-
-        service = build('sheets', 'v4', credentials=self.credentials)
-        sheet = service.spreadsheets()
-
-        # Fetch existing rows to calculate the starting row
-        range_name = f"{self.tab_name}!A1:Q"
-        result = sheet.values().get(spreadsheetId=self.spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
-        start_row = len(values) + 1
-
-        # Prepare data for appending
-        data_to_write = [data_frame.columns.tolist()] if start_row == 1 else []  # Add header if sheet is empty
-        data_to_write += data_frame.values.tolist()
-
-        range_to_write = f"{self.tab_name}!A{start_row}"
-        print(f"Writing to range: {range_to_write}")
-
-        # Append data to the Google Sheet
-        request = sheet.values().append(
-            spreadsheetId=self.spreadsheet_id,
-            range=range_to_write,
-            valueInputOption="USER_ENTERED",
-            insertDataOption="INSERT_ROWS",
-            body={"values": data_to_write}
-        )
-        response = request.execute()
-        print(f"Data appended successfully to tab '{self.tab_name}'.")
\ No newline at end of file
+        reporter.debug(f"Data appended successfully to tab '{self.tab_name}'.")
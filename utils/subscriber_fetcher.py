@@ -1,19 +1,31 @@
 import aiohttp
 import asyncio
-from rich.console import Console
+from collections import namedtuple
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
 
+from utils.http_session import session_scope
+from utils.rate_limiter import AdaptiveLimiter
+from utils.metrics import run_metrics
+from utils.reporter import reporter
+
 load_dotenv()
 
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# One page of raw subscribers, the date window it belongs to and the cursor that resumes after it
+SubscriberPage = namedtuple("SubscriberPage", ["window", "subscribers", "end_cursor"])
+
 class SubscriberFetcher:
-    def __init__(self, base_url="https://api.kit.com/v4"):
+    def __init__(self, base_url="https://api.kit.com/v4", limiter=None):
         """
         Initialize AsyncSubscriberFetcher with API key and base URL.
 
         Args:
             env_manager (EnvironmentManager): Instance to fetch environment variables.
             base_url (str): API base URL (default is https://api.kit.com/v4).
+            limiter (AdaptiveLimiter): Request budget for api.kit.com; it also retries failed pages.
         """
         self.api_key = os.getenv("KIT_V4_API_KEY")
         self.base_url = base_url
@@ -21,9 +33,9 @@ class SubscriberFetcher:
             'Accept': 'application/json',
             'X-Kit-Api-Key': self.api_key
         }
-        self.console = Console()
+        self.limiter = limiter or AdaptiveLimiter.from_settings("api.kit.com")
 
-    async def fetch_subscribers(self, starting_date, ending_date, per_page=500, max_records=15000):
+    async def fetch_subscribers(self, starting_date, ending_date, per_page=500, session=None, hourly=False):
         """
         Fetch all subscribers from the API within the date range asynchronously.
 
@@ -31,51 +43,151 @@ class SubscriberFetcher:
             starting_date (str): Start date in ISO format (e.g., "2025-01-05T00:00:00Z").
             ending_date (str): End date in ISO format (e.g., "2025-01-05T23:59:59Z").
             per_page (int): Number of records per page.
-            max_records (int): Maximum records to fetch.
+            session (aiohttp.ClientSession): Shared run session; a temporary one is used if omitted.
+            hourly (bool): Fetch hourly sub-windows concurrently.
 
         Returns:
             list: List of subscriber dictionaries.
         """
+        subscribers = []
+        async for page in self.iter_subscriber_pages(starting_date, ending_date, per_page, session, hourly=hourly):
+            subscribers.extend(page.subscribers)
+        return subscribers
+
+    @staticmethod
+    def window_key(window_start, window_end):
+        return f"{window_start}|{window_end}"
+
+    @staticmethod
+    def split_windows(starting_date, ending_date, hourly=False):
+        """
+        Split a date range into the windows that are paginated independently.
+
+        Returns:
+            list: (window_start, window_end) ISO string pairs.
+        """
+        if not hourly:
+            return [(starting_date, ending_date)]
+        start = datetime.strptime(starting_date, ISO_FORMAT)
+        end = datetime.strptime(ending_date, ISO_FORMAT)
+        windows = []
+        while start <= end:
+            window_end = min(start + timedelta(hours=1) - timedelta(seconds=1), end)
+            windows.append((start.strftime(ISO_FORMAT), window_end.strftime(ISO_FORMAT)))
+            start += timedelta(hours=1)
+        return windows
+
+    async def iter_subscriber_pages(self, starting_date, ending_date, per_page=500, session=None, checkpoint=None, hourly=False):
+        """
+        Yield pages of subscribers within the date range as they arrive.
+
+        Args:
+            starting_date (str): Start date in ISO format (e.g., "2025-01-05T00:00:00Z").
+            ending_date (str): End date in ISO format (e.g., "2025-01-05T23:59:59Z").
+            per_page (int): Number of records per page.
+            session (aiohttp.ClientSession): Shared run session; a temporary one is used if omitted.
+            checkpoint (PaginationCheckpoint): Resume each window after its last written cursor.
+            hourly (bool): Paginate hourly sub-windows concurrently instead of one window.
+
+        Yields:
+            SubscriberPage: One page of raw subscribers with its window and end cursor.
+        """
+        windows = self.split_windows(starting_date, ending_date, hourly)
+
+        async with session_scope(session) as session:
+            if len(windows) == 1:
+                async for page in self.iter_window_pages(*windows[0], per_page, session, checkpoint):
+                    yield page
+                return
+
+            # Sub-windows paginate concurrently under the api.kit.com budget and feed one stream
+            pages = asyncio.Queue(maxsize=len(windows))
+
+            async def drain(window_start, window_end):
+                try:
+                    async for page in self.iter_window_pages(window_start, window_end, per_page, session, checkpoint):
+                        await pages.put(page)
+                    await pages.put(None)
+                except Exception as e:
+                    await pages.put(e)
+
+            tasks = [asyncio.create_task(drain(*window)) for window in windows]
+            remaining = len(tasks)
+            try:
+                while remaining:
+                    item = await pages.get()
+                    if item is None:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def iter_window_pages(self, window_start, window_end, per_page=500, session=None, checkpoint=None):
+        """
+        Paginate a single date window with no record ceiling.
+
+        Yields:
+            SubscriberPage: Pages in cursor order, starting after the checkpointed cursor if any.
+        """
+        window = self.window_key(window_start, window_end)
         params = {
-            "created_after": starting_date,
-            "created_before": ending_date,
+            "created_after": window_start,
+            "created_before": window_end,
             "per_page": per_page,
             "status": 'active'
         }
-        subscribers = []
-        next_page_cursor = None
+        next_page_cursor = checkpoint.get(window) if checkpoint else None
+        fetched = 0
 
-        self.console.print(f"[bold yellow]Fetching subscribers from {starting_date} to {ending_date}")
-        
-        async with aiohttp.ClientSession() as session:
-            while len(subscribers) < max_records:
-                if next_page_cursor:
-                    params['after'] = next_page_cursor
-                
-                try:
-                    async with session.get(f"{self.base_url}/subscribers", headers=self.headers, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            new_subscribers = data.get('subscribers', [])
-                            subscribers.extend(new_subscribers)
-                            
-                            pagination = data.get('pagination', {})
-                            if pagination.get('has_next_page') and len(subscribers) < max_records:
-                                next_page_cursor = pagination.get('end_cursor')
-                                self.console.print(f"[yellow]Fetched {len(subscribers)} subscribers so far, getting next page...")
-                            else:
-                                break
-                        else:
-                            error_text = await response.text()
-                            self.console.print(f"[red]Failed to fetch data. Status code: {response.status}")
-                            self.console.print(f"[red]Error response: {error_text}")
-                            break
-                except Exception as e:
-                    self.console.print(f"[red]Error during subscriber fetch: {e}")
-                    break
+        if next_page_cursor:
+            reporter.info(f"Resuming subscribers from {window_start} to {window_end} after checkpoint")
+        else:
+            reporter.info(f"Fetching subscribers from {window_start} to {window_end}")
+
+        while True:
+            if next_page_cursor:
+                params['after'] = next_page_cursor
+
+            with run_metrics.stage("pagination"):
+                data = await self.fetch_page(session, params)
+            page = data.get('subscribers', [])
+            pagination = data.get('pagination', {})
+            next_page_cursor = pagination.get('end_cursor') or next_page_cursor
+            fetched += len(page)
+
+            if page:
+                yield SubscriberPage(window, page, next_page_cursor)
+
+            if not pagination.get('has_next_page'):
+                break
+            reporter.debug(f"Fetched {fetched} subscribers so far, getting next page...")
 
-        self.console.print(f"[bold green]Successfully fetched {len(subscribers)} subscribers")
-        return subscribers[:max_records]
+        reporter.info(f"Successfully fetched {fetched} subscribers from {window_start} to {window_end}")
+
+    async def fetch_page(self, session, params):
+        """
+        Fetch one page of /subscribers, failing instead of returning a partial result.
+
+        The limiter already retries 429s, 5xx responses and connection errors with
+        backoff, so whatever it ends with is final.
+
+        Raises:
+            RuntimeError: If the page could not be fetched.
+        """
+        window = f"{params['created_after']} to {params['created_before']}"
+        try:
+            async with self.limiter.request(session, "GET", f"{self.base_url}/subscribers", headers=self.headers, params=params) as response:
+                if response.status == 200:
+                    return await response.json()
+                error_text = await response.text()
+        except Exception as e:
+            raise RuntimeError(f"Subscribers page failed ({window}): {e}") from e
+        raise RuntimeError(f"Subscribers page failed ({window}). Status code: {response.status}. "
+                           f"Error response: {error_text}")
 
     async def filter_subscribers(self, subscribers):
         """
@@ -95,9 +207,11 @@ class SubscriberFetcher:
                 "name": subscriber.get('first_name'),
                 "email": subscriber.get('email_address'),
                 "status": subscriber.get('state'),
+                # Custom fields as listed, so the UTM fallback only asks for them when the page had none
+                "fields": subscriber.get('fields'),
                 "location_state": None,  # Will be populated later
                 "location_country": None  # Will be populated later
             })
         
-        self.console.print(f"[green]Filtered {len(filtered_subscribers)} subscribers")
+        reporter.debug(f"Filtered {len(filtered_subscribers)} subscribers")
         return filtered_subscribers
\ No newline at end of file
@@ -1,60 +1,84 @@
-from supabase import create_client
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
-import time
-import requests, pandas as pd
+import threading
+
+from config.settings import (
+    supabase_table,
+    supabase_conflict_columns,
+    supabase_batch_size,
+    supabase_max_workers,
+    webhook_delay_seconds,
+)
+from utils.reporter import reporter
 
 load_dotenv()
 
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 
 class SupabaseSubmitter:
-    def __init__(self, df):
-        self.df = df
+    """
+    Long-lived Supabase sink. One client is reused for the whole run and rows are
+    upserted on the natural key, so reruns update rows instead of duplicating them.
+    """
+
+    def __init__(self, table=supabase_table, conflict_columns=supabase_conflict_columns,
+                 batch_size=supabase_batch_size, max_workers=supabase_max_workers):
+        self.table = table
+        self.conflict_columns = conflict_columns
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.records_submitted = 0
+        self._client = None
+        self._lock = threading.Lock()
 
     def establish_connection(self):
+        from supabase import create_client
+
         supabase_api_url = os.getenv("SUPABASE_PROJECT_URL")
         supabase_api_key = os.getenv("SUPABASE_PROJECT_KEY")
         return create_client(supabase_api_url, supabase_api_key)
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self.establish_connection()
+            return self._client
     
-    def _prepare_data(self):
-        """
-        Adjusts the data specifically for Supabase's requirements.
-        - Converts Excel serial dates back to YYYY-MM-DD
-        """
-        if 'subscriber_created_at' in self.df.columns:
-            self.df['subscriber_created_at'] = pd.to_datetime(
-                self.df['subscriber_created_at'] - 2, 
-                unit='D', 
-                origin='1900-01-01'
-            ).dt.strftime('%Y-%m-%d')
-
-    def trigger_webhook(self):
-        print("Sleeping 120 seconds before triggering webhook...")
-        time.sleep(120)
+    def _upsert_batch(self, records):
+        self.client.table(self.table).upsert(records, on_conflict=self.conflict_columns).execute()
+        with self._lock:
+            self.records_submitted += len(records)
+
+    def _post_webhook(self):
+        import requests
+
         try:
             response = requests.post(
                 WEBHOOK_URL,
                 json={
                     "event": "supabase_insert_complete",
-                    "table": "kit_subscribers",
-                    "records_inserted": len(self.df),
+                    "table": self.table,
+                    "records_inserted": self.records_submitted,
                     "status": "success"
                 }
             )
             response.raise_for_status()
-            print(f"Webhook triggered successfully. Status: {response.status_code}")
+            reporter.info(f"Webhook triggered successfully. Status: {response.status_code}")
         except requests.exceptions.RequestException as e:
-            print(f"Failed to trigger webhook. Error: {e}")
+            reporter.error(f"Failed to trigger webhook. Error: {e}")
 
-    def submit_df(self):
+    async def trigger_webhook(self, delay=webhook_delay_seconds):
+        """Fire the completion webhook once, after delay seconds, without blocking the event loop."""
+        reporter.info(f"Triggering webhook in {delay} seconds...")
+        await asyncio.sleep(delay)
+        await asyncio.to_thread(self._post_webhook)
 
-        self._prepare_data()
-        client = self.establish_connection()
-        try:
-            records = self.df.to_dict(orient="records")
-            response = client.table("kit_subscribers").insert(records).execute()
-            print("Successfully appended data to Supabase: kit_subscribers")
-            self.trigger_webhook()
-        except Exception as e:
-            print(f"Couldn't submit data to Supabase. Error message: {e}")
\ No newline at end of file
+    def upsert_records(self, records):
+        """Upsert prepared records in parallel batches; errors propagate to the caller."""
+        batches = [records[start:start + self.batch_size] for start in range(0, len(records), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(self._upsert_batch, batches))
+        reporter.debug(f"Successfully upserted {len(records)} records to Supabase: {self.table}")
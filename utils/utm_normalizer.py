@@ -0,0 +1,70 @@
+import re
+
+from config.settings import (
+    facebook_ads_campaigns,
+    utm_ad_id_pattern,
+    utm_facebook_sources,
+    utm_facebook_label,
+    utm_paid_medium_label,
+)
+
+UTM_KEYS = ("source", "medium", "campaign", "content")
+
+
+class UtmNormalizer:
+    """
+    Rule-driven clean-up of subscriber UTM fields.
+
+    The rules are read from config once and compiled: the ad id pattern is a
+    compiled regex and the known Facebook sources and paid campaign mediums are
+    frozensets.
+
+    - A source that contains an ad id or is a known Facebook source becomes the Facebook label.
+    - A campaign that contains an ad id becomes the Facebook label.
+    - Otherwise, a medium that is a known paid campaign becomes the paid label.
+    """
+
+    def __init__(self, ad_id_pattern=utm_ad_id_pattern, facebook_sources=utm_facebook_sources,
+                 paid_mediums=facebook_ads_campaigns, facebook_label=utm_facebook_label,
+                 paid_label=utm_paid_medium_label):
+        self.ad_id = re.compile(ad_id_pattern)
+        self.facebook_sources = frozenset(facebook_sources)
+        self.paid_mediums = frozenset(paid_mediums)
+        self.facebook_label = facebook_label
+        self.paid_label = paid_label
+
+    def normalize(self, source, medium, campaign, content):
+        """
+        Apply the rules to one set of UTM values.
+
+        Returns:
+            dict: Normalized values keyed by source, medium, campaign and content.
+        """
+        source = source or ""
+        medium = medium or ""
+        campaign = campaign or ""
+        content = content or ""
+
+        if source in self.facebook_sources or self.ad_id.search(source):
+            source = self.facebook_label
+
+        if self.ad_id.search(campaign):
+            campaign = self.facebook_label
+        elif medium in self.paid_mediums:
+            medium = self.paid_label
+
+        return {"source": source, "medium": medium, "campaign": campaign, "content": content}
+
+    def normalize_fields(self, fields):
+        """
+        Normalize the utm_* custom fields of a Kit subscriber.
+
+        Args:
+            fields (dict): The subscriber's "fields" object; missing or null fields count as "".
+        """
+        return self.normalize(fields.get("utm_source"), fields.get("utm_medium"),
+                              fields.get("utm_campaign"), fields.get("utm_content"))
+
+
+# Rules are loaded from config once per process
+normalizer = UtmNormalizer()